@@ -0,0 +1,936 @@
+"""Clone or pull subrepo concurrently, from mirrors and lock files.
+
+Module of [plugins.py][plugins], see
+[fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+"""
+
+# pylint: disable=R0801,C0415
+# - C0415: Import outside toplevel, heavy dependencies are imported on first
+#   use, see `typing.TYPE_CHECKING` below
+
+# Annotations naming lazily imported modules are not evaluated
+from __future__ import annotations
+
+# Queue of subrepo which nested subrepo are not listed yet
+# https://docs.python.org/3/library/collections.html
+import collections
+
+# Launching parallel tasks
+# https://docs.python.org/3/library/concurrent.futures.html
+import concurrent.futures
+
+# Bind arguments of phases of the build
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# Secure hashes and message digests
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+
+# JSON encoder and decoder
+# https://docs.python.org/3/library/json.html
+import json
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Regular expression operations
+# https://docs.python.org/3/library/re.html
+import re
+
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
+# Time access and conversions
+# https://docs.python.org/3/library/time.html
+import time
+
+# Names of lazily imported modules used in type hints
+# https://docs.python.org/3/library/typing.html
+import typing
+
+# Git repos kept open across builds
+# docs/_data/plugins_git.py
+from plugins_git import has_commit
+
+# Data files validated by compiled schemas and cached
+# docs/_data/plugins_schema.py
+from plugins_schema import load_yaml_file, parse_yaml, write_data_cache_file
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import (
+    CACHE_DIR,
+    ERR_CLR,
+    GIT_CONTEXT,
+    INFO_CLR,
+    LOG,
+    RESET_CLR,
+    get_files_fingerprint,
+    get_head_commit,
+    get_state_module,
+    timed_call,
+    traced,
+)
+
+# Data files of subrepo merged into the configuration
+# docs/_data/plugins_subrepo.py
+from plugins_subrepo import (
+    PIPELINE_STATS,
+    PIPELINE_STATS_GUARD,
+    SUBREPO_PIPELINE,
+    get_subrepo_config,
+    get_subrepo_data_file,
+    list_subrepo,
+    validate_subrepo,
+)
+
+# Following dependencies are slow to import and not always needed. They are
+# imported by methods using them, on first use, and only for type hints here.
+if typing.TYPE_CHECKING:
+    # Python Git Library
+    # https://pypi.org/project/GitPython/
+    import git
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+SUBREPO_JOBS = 4
+"""Default number of subrepo cloned or pulled concurrently."""
+SUBREPO_TIMEOUT = 300
+"""Default number of seconds after which cloning or pulling a subrepo fails."""
+SUBREPO_LOCK_FILE = "subrepo.lock"
+"""Name of the file in `docs/_data` storing commits of subrepo."""
+SUBREPO_FETCH_CACHE = "subrepo_fetch.json"
+"""Name of the file in `CACHE_DIR` storing when subrepo were last fetched."""
+SUBREPO_FETCH_STATUS = {}
+"""Status of subrepo, `fetched`, `kept` or `stale`, by subrepo root."""
+FETCH_POLICY_REGEX = re.compile(
+    r"^if-older-than (?P<ttl>[0-9]+)(?P<unit>[smhd]?)$"
+)
+"""Grammar of fetch policy `if-older-than <ttl>`, e.g. `if-older-than 12h`."""
+FETCH_POLICY_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+"""Number of seconds of units of the `<ttl>` of a fetch policy."""
+MIRROR_LOCKS = {}
+"""Locks ensuring a subrepo mirror is not updated twice at the same time."""
+MIRROR_LOCKS_GUARD = threading.Lock()
+"""Lock protecting the creation of locks in `MIRROR_LOCKS`."""
+
+
+def update_mirror(
+    git_url: str, mirror_dir: str, timeout: float = None, commit: str = None
+) -> str:
+    """Create or update the local bare mirror of a subrepo.
+
+    Mirrors are stored in `mirror_dir` in a folder named after the hash of
+    `git_url`, such that a subrepo used by multiple projects, or multiple times
+    in the same project, is stored only once.
+
+    If `commit` is provided and already in the mirror, the mirror is not
+    fetched. Objects of mirrors are never deleted, see
+    [keep_mirror_objects][plugins_fetch.keep_mirror_objects].
+
+    Args:
+        git_url: SSH or HTTP URL of the subrepo,
+        mirror_dir: Absolute path of the folder storing mirrors,
+        timeout: Number of seconds after which git is killed, if any,
+        commit: SHA of the commit the subrepo is locked to, if any.
+
+    Returns:
+        The absolute path of the mirror of the subrepo.
+    """
+    mirror_path = os.path.join(
+        mirror_dir, f"{hashlib.sha256(git_url.encode()).hexdigest()}.git"
+    )
+    with MIRROR_LOCKS_GUARD:
+        lock = MIRROR_LOCKS.setdefault(mirror_path, threading.Lock())
+
+    with lock:
+        if os.path.isdir(mirror_path):
+            mirror = GIT_CONTEXT.repo(mirror_path)
+            # Mirrors created before objects were kept
+            keep_mirror_objects(mirror)
+            if not commit or not has_commit(mirror, commit):
+                mirror.git.fetch(
+                    "--prune", "origin", kill_after_timeout=timeout
+                )
+        else:
+            keep_mirror_objects(
+                GIT_CONTEXT.clone(git_url, mirror_path, timeout, mirror=True)
+            )
+    return mirror_path
+
+
+def keep_mirror_objects(mirror: git.Repo) -> None:
+    """Prevent git from deleting objects of a mirror.
+
+    Subrepo cloned from a mirror use its objects through git alternates,
+    without the mirror referencing them. Once `git fetch --prune` removed a
+    branch of the mirror, or a branch was force pushed, `git gc`, run
+    automatically by git, would delete objects subrepo still use. Automatic
+    `git gc` is thus disabled in mirrors, and unreachable objects are never
+    pruned.
+
+    Args:
+        mirror: Git python object of the mirror.
+    """
+    reader = mirror.config_reader("repository")
+    if reader.get_value("gc", "pruneExpire", "") == "never":
+        return
+    with mirror.config_writer() as writer:
+        writer.set_value("gc", "auto", 0)
+        writer.set_value("gc", "pruneExpire", "never")
+
+
+def pull_subrepo(
+    git_subrepo: git.Repo, remote: str, config: dict, commit: str = None
+) -> None:
+    """Update an already cloned subrepo from `remote`.
+
+    If `commit` is provided, only fetch this commit, otherwise pull branch
+    `master`. See [fetch_subrepo][plugins_fetch.fetch_subrepo] for the
+    description of `config`.
+
+    Args:
+        git_subrepo: Git python object of the subrepo,
+        remote: Name of the remote or path of the mirror to pull from,
+        config: Dictionary describing how subrepo are fetched,
+        commit: SHA of the commit to fetch, if any.
+    """
+    fetch_args = []
+    if config["checkout"] == "sparse" and not config["mirror_dir"]:
+        fetch_args = ["--depth=1", "--filter=blob:none"]
+
+    timeout = config["timeout"]
+    if commit:
+        git_subrepo.git.fetch(
+            *fetch_args, remote, commit, kill_after_timeout=timeout
+        )
+    elif config["checkout"] == "sparse":
+        # A shallow history can not be merged, move to the fetched commit
+        # while keeping local changes.
+        git_subrepo.git.fetch(
+            *fetch_args, remote, "master", kill_after_timeout=timeout
+        )
+        git_subrepo.git.reset("--keep", "FETCH_HEAD")
+    else:
+        git_subrepo.git.pull(remote, "master", kill_after_timeout=timeout)
+
+
+def clone_subrepo(
+    repo_dict: dict, subrepo_root: str, remote: str, config: dict
+) -> git.Repo:
+    """Clone a subrepo, from its `git_url` or from its mirror.
+
+    See [fetch_subrepo][plugins_fetch.fetch_subrepo] for the description of
+    `config`.
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        remote: Path of the mirror to clone from or `origin`,
+        config: Dictionary describing how subrepo are fetched.
+
+    Returns:
+        Git python object of the cloned subrepo.
+    """
+    sparse = config["checkout"] == "sparse"
+    clone_args = {}
+    if config["mirror_dir"]:
+        # Objects are shared with the mirror through git alternates, the
+        # mirror never deletes them, see keep_mirror_objects()
+        clone_args["shared"] = True
+    elif sparse:
+        clone_args.update({"depth": 1, "filter": "blob:none"})
+    if sparse:
+        clone_args.update({"branch": "master", "no_checkout": True})
+
+    git_subrepo = GIT_CONTEXT.clone(
+        remote if config["mirror_dir"] else repo_dict["git_url"],
+        subrepo_root,
+        config["timeout"],
+        **clone_args,
+    )
+    if config["mirror_dir"]:
+        # Written without starting `git remote set-url`
+        with git_subrepo.config_writer() as writer:
+            writer.set_value('remote "origin"', "url", repo_dict["git_url"])
+    if sparse:
+        git_subrepo.git.sparse_checkout(
+            "set",
+            "--cone",
+            os.path.join(repo_dict.get("subpath", ""), "docs"),
+        )
+        git_subrepo.git.checkout("master")
+    return git_subrepo
+
+
+def fetch_subrepo(
+    repo_dict: dict, subrepo_root: str, config: dict, commit: str = None
+) -> str:
+    """Clone or pull a single subrepo.
+
+    If `subrepo_root` already exists, pull branch `master` from remote
+    `origin`, else clone the subrepo from its `git_url`.
+
+    If `commit` is provided, i.e. the subrepo is locked in `subrepo.lock`, the
+    subrepo is checked out at this commit. If this commit is already available
+    locally, nothing is fetched, otherwise only this commit is fetched.
+
+    If `config["checkout"]` is `sparse`, only the last commit of branch
+    `master` is fetched, without blobs which are not needed, and only the
+    `docs` folder (in `subpath` if defined) and the `mkdocs.yml` file are
+    checked out. Folders in `src_path` are later added by
+    [add_sparse_src_path][plugins_subrepo.add_sparse_src_path].
+
+    If `config["mirror_dir"]` is set, only the local mirror of the subrepo is
+    fetched from the network, unless it already holds `commit`, see
+    [update_mirror][plugins_fetch.update_mirror].
+    Subrepo is then cloned from this mirror, sharing its objects, or pulled
+    from this mirror.
+
+    Git commands accessing the network are killed after `timeout` seconds, as
+    defined for the subrepo in `subrepo.yaml`, else after `config["timeout"]`
+    seconds.
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        config: Dictionary with keys `checkout`, either `full` or `sparse`,
+            `mirror_dir`, path of the folder storing mirrors or `None`, and
+            `timeout`, number of seconds or `None`,
+        commit: SHA of the commit the subrepo is locked to, if any.
+
+    Returns:
+        The SHA of the commit checked out in the subrepo.
+    """
+    config = dict(config, timeout=repo_dict.get("timeout", config["timeout"]))
+    if commit and os.path.isdir(subrepo_root):
+        git_subrepo = GIT_CONTEXT.repo(subrepo_root)
+        if has_commit(git_subrepo, commit):
+            print(
+                f"{INFO_CLR}INFO [macros] - Using locked commit of repo "
+                f"{repo_dict['name']}{RESET_CLR}"
+            )
+            with traced("checkout", repo=repo_dict["name"], commit=commit):
+                git_subrepo.git.checkout("--detach", commit)
+            return commit
+
+    remote = "origin"
+    if config["mirror_dir"]:
+        with traced("update_mirror", repo=repo_dict["name"]):
+            remote = update_mirror(
+                repo_dict["git_url"],
+                config["mirror_dir"],
+                config["timeout"],
+                commit,
+            )
+
+    if os.path.isdir(subrepo_root):
+        print(
+            f"{INFO_CLR}INFO [macros] - Pulling repo {repo_dict['name']}{RESET_CLR}"
+        )
+        git_subrepo = GIT_CONTEXT.repo(subrepo_root)
+        with traced("pull_subrepo", repo=repo_dict["name"]):
+            pull_subrepo(git_subrepo, remote, config, commit)
+    else:
+        print(
+            f"{INFO_CLR}INFO [macros] - Cloning repo {repo_dict['name']}{RESET_CLR}"
+        )
+        with traced("clone_subrepo", repo=repo_dict["name"]):
+            git_subrepo = clone_subrepo(repo_dict, subrepo_root, remote, config)
+            if commit and not has_commit(git_subrepo, commit):
+                pull_subrepo(git_subrepo, remote, config, commit)
+
+    if commit:
+        with traced("checkout", repo=repo_dict["name"], commit=commit):
+            git_subrepo.git.checkout("--detach", commit)
+    return git_subrepo.head.commit.hexsha
+
+
+def get_fetch_config(env: dict) -> dict:
+    """Return how subrepo are fetched, from `subrepo_config`.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+
+    Returns:
+        Dictionary with keys `checkout`, `mirror_dir` and `timeout`, see
+        [fetch_subrepo][plugins_fetch.fetch_subrepo].
+    """
+    config = {
+        "checkout": get_subrepo_config(env, "checkout", "full"),
+        "mirror_dir": None,
+        "timeout": get_subrepo_config(env, "timeout", SUBREPO_TIMEOUT),
+    }
+    if get_subrepo_config(env, "mirror", False):
+        config["mirror_dir"] = os.path.expanduser(
+            get_subrepo_config(
+                env, "mirror_dir", os.path.join(CACHE_DIR, "mirrors")
+            )
+        )
+    return config
+
+
+def get_fetch_max_age(fetch_policy: str) -> float:
+    """Return the age after which a subrepo is fetched again.
+
+    Arguments:
+        fetch_policy: Either `always`, `never` or `if-older-than <ttl>`, where
+            `<ttl>` is a number of seconds, or a number followed by `s`, `m`,
+            `h` or `d`.
+
+    Returns:
+        Number of seconds, `0` to always fetch subrepo, infinite to never fetch
+        already cloned subrepo.
+    """
+    if fetch_policy == "never":
+        return float("inf")
+    match = FETCH_POLICY_REGEX.match(fetch_policy)
+    if not match:
+        return 0.0
+    return float(int(match["ttl"]) * FETCH_POLICY_UNITS[match["unit"]])
+
+
+def fetch_or_keep_subrepo(
+    repo_dict: dict, subrepo_root: str, config: dict, commit: str = None
+) -> str:
+    """Fetch a subrepo, or keep its checkout if possible.
+
+    A subrepo cloned and fetched less than `config["max_age"]` seconds ago,
+    according to `config["fetched_at"]`, is kept as is, unless it is locked to
+    a commit. If fetching a cloned subrepo fails, e.g. its remote is
+    unreachable or slower than the timeout, its checkout is kept and reported
+    as stale. Otherwise, see [fetch_subrepo][plugins_fetch.fetch_subrepo].
+    Status of the subrepo is stored in
+    [SUBREPO_FETCH_STATUS][plugins_fetch.SUBREPO_FETCH_STATUS].
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        config: Dictionary describing how subrepo are fetched, with keys
+            `max_age`, see [get_fetch_max_age][plugins_fetch.get_fetch_max_age],
+            and `fetched_at`, time of the last fetch by subrepo root,
+        commit: SHA of the commit the subrepo is locked to, if any.
+
+    Returns:
+        The SHA of the commit checked out in the subrepo.
+    """
+    import git
+
+    cloned = os.path.isdir(subrepo_root)
+    age = time.time() - config["fetched_at"].get(subrepo_root, 0.0)
+    if cloned and not commit and age < config["max_age"]:
+        print(
+            f"{INFO_CLR}INFO [macros] - Keeping repo {repo_dict['name']}"
+            f"{RESET_CLR}"
+        )
+        SUBREPO_FETCH_STATUS[subrepo_root] = "kept"
+        return get_head_commit(subrepo_root)
+
+    try:
+        head = fetch_subrepo(repo_dict, subrepo_root, config, commit)
+    except git.GitCommandError as error:
+        if not cloned:
+            raise
+        LOG.warning(
+            "%s[macros] - Fetching repo %s failed, using its stale checkout: "
+            "%s%s",
+            ERR_CLR,
+            repo_dict["name"],
+            " ".join(error.stderr.split()) or error,
+            RESET_CLR,
+        )
+        SUBREPO_FETCH_STATUS[subrepo_root] = "stale"
+        return get_head_commit(subrepo_root)
+    SUBREPO_FETCH_STATUS[subrepo_root] = "fetched"
+    return head
+
+
+def load_subrepo_lock(lock_file: str) -> dict:
+    """Load the content of the file `subrepo.lock`.
+
+    Args:
+        lock_file: Absolute path of the file `subrepo.lock`.
+
+    Returns:
+        A dictionary which keys are path of subrepo relative to the root of the
+        documentation and values are dictionary with keys `git_url` and
+        `commit`. Empty if the file does not exists.
+    """
+    if not os.path.isfile(lock_file):
+        return {}
+    with open(lock_file, encoding="UTF-8") as file:
+        return parse_yaml(file) or {}
+
+
+def remove_subrepo(subrepo_dict: dict, repo_list: list) -> None:
+    """Remove repos from a dictionary storing subrepo.
+
+    Args:
+        subrepo_dict: Dictionary storing subrepo,
+        repo_list: List of repo dictionaries of `subrepo_dict` to remove.
+    """
+    for i_key, i_value in subrepo_dict.items():
+        if isinstance(i_value, list):
+            i_value[:] = [
+                i_repo
+                for i_repo in i_value
+                if not any(i_repo is j_repo for j_repo in repo_list)
+            ]
+        elif isinstance(i_value, dict) and i_key not in ["nav_entry"]:
+            remove_subrepo(i_value, repo_list)
+
+
+def load_nested_subrepo(repo_dict: dict, subrepo_root: str) -> dict:
+    """Load the file `subrepo.yaml` of a fetched subrepo, if any.
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo.
+
+    Returns:
+        Content of key `subrepo` of the file, or None if the subrepo does not
+        include subrepo.
+    """
+    data_dir = os.path.dirname(get_subrepo_data_file(repo_dict, subrepo_root))
+    for i_file in ("subrepo.yaml", "subrepo.yml"):
+        if os.path.isfile(os.path.join(data_dir, i_file)):
+            data, _ = load_yaml_file(data_dir, i_file)
+            return (data or {}).get("subrepo")
+    return None
+
+
+def link_subrepo(subrepo_root: str, target_root: str) -> None:
+    """Make a subrepo root a link to the working tree of the same subrepo.
+
+    Arguments:
+        subrepo_root: Absolute path of the location of the subrepo,
+        target_root: Absolute path of the working tree of the subrepo,
+            fetched at another location.
+    """
+    target = os.path.relpath(target_root, os.path.dirname(subrepo_root))
+    if os.path.islink(subrepo_root):
+        if os.readlink(subrepo_root) == target:
+            return
+        os.remove(subrepo_root)
+    os.makedirs(os.path.dirname(subrepo_root), exist_ok=True)
+    os.symlink(target, subrepo_root, target_is_directory=True)
+
+
+def init_subrepo_fetcher(env: dict) -> dict:
+    """Return the state shared by functions fetching every subrepo.
+
+    See [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+
+    Returns:
+        Dictionary with keys `env`, `config`, see
+        [fetch_or_keep_subrepo][plugins_fetch.fetch_or_keep_subrepo],
+        `recursive`, `origin`, URL of the remote of the repo holding the
+        documentation, `lock_file`, `locked`, content of `lock_file` if subrepo
+        are locked, `build`, see
+        [get_state_module][plugins_state.get_state_module], `roots`, dictionary
+        of subrepo by path, `futures`, fetch of subrepo by path, `fetched_urls`,
+        first path of subrepo by git URL, `parent_urls`, git URL of subrepo and
+        subrepo including them by path, `links`, paths linked to the first path
+        of their subrepo, `cycles`, subrepo including themselves, `pending`,
+        paths of subrepo which nested subrepo are not listed yet, `executor`,
+        pool fetching subrepo, and `validator`, pool validating fetched subrepo.
+    """
+    config = get_fetch_config(env)
+    fetched_at = load_fetch_times()
+    config.update(
+        {
+            "max_age": get_fetch_max_age(
+                get_subrepo_config(env, "fetch_policy", "always")
+            ),
+            "fetched_at": dict(fetched_at),
+        }
+    )
+    lock_update = os.environ.get("MKDOCS_SUBREPO_LOCK_UPDATE")
+    if lock_update:
+        # The lock file records commits of fetched subrepo, not kept ones
+        config["max_age"] = 0.0
+    recursive = get_subrepo_config(env, "recursive", False)
+    origin = ()
+    if recursive:
+        git_repo = GIT_CONTEXT.repo(
+            env.project_dir, search_parent_directories=True
+        )
+        if git_repo.remotes:
+            origin = (git_repo.remotes.origin.url,)
+
+    lock_file = os.path.join(
+        env.project_dir, "docs", "_data", SUBREPO_LOCK_FILE
+    )
+    locked = {}
+    if get_subrepo_config(env, "lock", False) and not lock_update:
+        locked = load_subrepo_lock(lock_file)
+
+    return {
+        "env": env,
+        "config": config,
+        "recursive": recursive,
+        "origin": origin,
+        "lock_file": lock_file,
+        "locked": locked,
+        # Subrepo already fetched by the build of a repo including this one
+        "build": get_state_module().build or {"fetched": set()},
+        # Same subrepo root can not be cloned or pulled twice at the same time
+        "roots": {},
+        "futures": {},
+        "fetched_urls": {},
+        "parent_urls": {},
+        "links": set(),
+        "cycles": [],
+        "pending": collections.deque(),
+        "executor": concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(
+                int(get_subrepo_config(env, "jobs", SUBREPO_JOBS)), 1
+            )
+        ),
+        "validator": concurrent.futures.ThreadPoolExecutor(max_workers=1),
+    }
+
+
+def on_subrepo_fetched(
+    fetcher: dict, subrepo_root: str, start: float, future
+) -> None:
+    """Queue the validation of a subrepo as soon as it is fetched.
+
+    Args:
+        fetcher: State of the fetch, see
+            [init_subrepo_fetcher][plugins_fetch.init_subrepo_fetcher],
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        start: Time the fetch of the subrepo was submitted,
+        future: Fetch of the subrepo.
+    """
+    with PIPELINE_STATS_GUARD:
+        PIPELINE_STATS["fetch"] += time.perf_counter() - start
+        PIPELINE_STATS["queue"] += 1
+        PIPELINE_STATS["max_queue"] = max(
+            PIPELINE_STATS["max_queue"], PIPELINE_STATS["queue"]
+        )
+    if future.exception() is None:
+        SUBREPO_PIPELINE[subrepo_root] = fetcher["validator"].submit(
+            validate_subrepo,
+            fetcher["env"],
+            fetcher["roots"][subrepo_root],
+            subrepo_root,
+            time.perf_counter(),
+        )
+    else:
+        with PIPELINE_STATS_GUARD:
+            PIPELINE_STATS["queue"] -= 1
+
+
+def submit_subrepo(
+    fetcher: dict, repo_dict: dict, subrepo_root: str, parent_root: str = None
+) -> None:
+    """Submit the fetch of a subrepo, unless it is already fetched.
+
+    A subrepo whose git URL is already fetched at another location is linked
+    to it, if `recursive` is set, and a subrepo including itself is reported
+    and not fetched. A link made by the build of a repo including this one is
+    kept.
+
+    Args:
+        fetcher: State of the fetch, see
+            [init_subrepo_fetcher][plugins_fetch.init_subrepo_fetcher],
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        parent_root: Absolute path of the subrepo including this one, if any.
+    """
+    git_url = repo_dict["git_url"]
+    parents = fetcher["parent_urls"].get(parent_root, fetcher["origin"])
+    if subrepo_root in fetcher["roots"]:
+        return
+    if fetcher["recursive"] and git_url in parents:
+        LOG.warning(
+            "%s[macros] - Subrepo %s includes itself: %s.%s",
+            ERR_CLR,
+            repo_dict["name"],
+            " -> ".join(parents + (git_url,)),
+            RESET_CLR,
+        )
+        fetcher["cycles"].append(repo_dict)
+        return
+    fetcher["roots"][subrepo_root] = repo_dict
+    if subrepo_root in fetcher["build"]["fetched"] and os.path.islink(
+        subrepo_root
+    ):
+        # Linked by the build of a repo including this one, whose fetched
+        # git URLs are not known here
+        fetcher["links"].add(subrepo_root)
+        return
+    if fetcher["recursive"] and git_url in fetcher["fetched_urls"]:
+        if os.path.islink(subrepo_root) or not os.path.exists(subrepo_root):
+            fetcher["links"].add(subrepo_root)
+            link_subrepo(subrepo_root, fetcher["fetched_urls"][git_url])
+            return
+    elif os.path.islink(subrepo_root):
+        # Link made by a previous build, replaced by the working tree
+        os.remove(subrepo_root)
+    fetcher["fetched_urls"].setdefault(git_url, subrepo_root)
+    fetcher["parent_urls"][subrepo_root] = parents + (git_url,)
+    fetcher["pending"].append(subrepo_root)
+    path = os.path.relpath(subrepo_root, fetcher["env"].project_dir)
+    if subrepo_root in fetcher["build"]["fetched"]:
+        future = fetcher["executor"].submit(get_head_commit, subrepo_root)
+    else:
+        locked_repo = fetcher["locked"].get(path, {})
+        future = fetcher["executor"].submit(
+            timed_call,
+            f"fetch_subrepo {path}",
+            fetch_or_keep_subrepo,
+            repo_dict,
+            subrepo_root,
+            fetcher["config"],
+            locked_repo.get("commit")
+            if locked_repo.get("git_url") == git_url
+            else None,
+        )
+    fetcher["futures"][subrepo_root] = future
+    future.add_done_callback(
+        functools.partial(
+            on_subrepo_fetched, fetcher, subrepo_root, time.perf_counter()
+        )
+    )
+
+
+def submit_nested_subrepo(fetcher: dict) -> list:
+    """Submit the fetch of subrepo of subrepo, as subrepo are fetched.
+
+    Args:
+        fetcher: State of the fetch, see
+            [init_subrepo_fetcher][plugins_fetch.init_subrepo_fetcher].
+
+    Returns:
+        List of tuples `(subrepo_dict, path)` of nested subrepo, see
+        [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+    """
+    nested = []
+    while fetcher["recursive"] and fetcher["pending"]:
+        subrepo_root = fetcher["pending"].popleft()
+        if fetcher["futures"][subrepo_root].exception() is not None:
+            continue
+        repo_dict = fetcher["roots"][subrepo_root]
+        nested_dict = load_nested_subrepo(repo_dict, subrepo_root)
+        if nested_dict:
+            # Build of the subrepo runs in its subpath, if any
+            nested_root = os.path.normpath(
+                os.path.join(subrepo_root, repo_dict.get("subpath", ""))
+            )
+            nested.append((nested_dict, nested_root))
+            for i_repo, i_root in list_subrepo(nested_dict, nested_root):
+                submit_subrepo(fetcher, i_repo, i_root, subrepo_root)
+    for i_subrepo, _ in nested:
+        remove_subrepo(i_subrepo, fetcher["cycles"])
+    return nested
+
+
+def load_fetch_times() -> dict:
+    """Load the time of the last fetch of each subrepo.
+
+    Returns:
+        Dictionary which keys are absolute path of subrepo and values are
+        timestamps, stored in
+        [SUBREPO_FETCH_CACHE][plugins_fetch.SUBREPO_FETCH_CACHE].
+    """
+    try:
+        with open(
+            os.path.join(os.path.expanduser(CACHE_DIR), SUBREPO_FETCH_CACHE),
+            encoding="UTF-8",
+        ) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_fetch_times(fetcher: dict) -> None:
+    """Store the time of the last fetch of each subrepo, if one was fetched.
+
+    Args:
+        fetcher: State of the fetch, see
+            [init_subrepo_fetcher][plugins_fetch.init_subrepo_fetcher].
+    """
+    fetched_at = dict(fetcher["config"]["fetched_at"])
+    for i_root in fetcher["futures"]:
+        if SUBREPO_FETCH_STATUS.get(i_root) == "fetched":
+            fetched_at[i_root] = time.time()
+    if fetched_at != fetcher["config"]["fetched_at"]:
+        write_data_cache_file(
+            os.path.join(os.path.expanduser(CACHE_DIR), SUBREPO_FETCH_CACHE),
+            fetched_at,
+        )
+
+
+def update_subrepo_lock(fetcher: dict) -> None:
+    """Write the commit of each fetched subrepo in `subrepo.lock`.
+
+    The file is only written if `subrepo_config["lock"]` is true and a commit
+    changed. The commit of a stale subrepo, which could not be fetched, is
+    kept as is.
+
+    Args:
+        fetcher: State of the fetch, see
+            [init_subrepo_fetcher][plugins_fetch.init_subrepo_fetcher].
+    """
+    env = fetcher["env"]
+    previous_lock = load_subrepo_lock(fetcher["lock_file"])
+    lock = {}
+    for i_root, i_future in fetcher["futures"].items():
+        i_path = os.path.relpath(i_root, env.project_dir)
+        if SUBREPO_FETCH_STATUS.get(i_root) == "stale":
+            # A network failure never changes the commit subrepo are locked to
+            if i_path in previous_lock:
+                lock[i_path] = previous_lock[i_path]
+            continue
+        lock[i_path] = {
+            "git_url": fetcher["roots"][i_root]["git_url"],
+            "commit": i_future.result(),
+        }
+
+    if get_subrepo_config(env, "lock", False) and lock != previous_lock:
+        import yaml
+
+        print(
+            f"{INFO_CLR}INFO [macros] - Updating "
+            f"{fetcher['lock_file']}{RESET_CLR}"
+        )
+        with open(fetcher["lock_file"], "w", encoding="UTF-8") as file:
+            file.write(
+                "# File generated by docs/_data/plugins.py, do not edit.\n"
+                "# Run `MKDOCS_SUBREPO_LOCK_UPDATE=true mkdocs build` to update"
+                " it.\n"
+            )
+            yaml.safe_dump(lock, file, default_flow_style=False)
+
+
+def fetch_all_subrepo(env: dict, subrepo_dict: dict, path: str) -> list:
+    """Concurrently clone or pull every subrepo.
+
+    Clone or pull every subrepo of `subrepo_dict` using a pool of at most
+    `subrepo_config["jobs"]` workers (from `docs/_data/vars.yml`, default to
+    [SUBREPO_JOBS][plugins_fetch.SUBREPO_JOBS]), such that the time spent is
+    bounded by the slowest subrepo rather than the sum of all subrepo.
+
+    If `subrepo_config["mirror"]` is true, subrepo are cloned or pulled from
+    local mirrors stored in `subrepo_config["mirror_dir"]` (default to
+    `mirrors` in [CACHE_DIR][plugins_state.CACHE_DIR]).
+
+    If `subrepo_config["lock"]` is true, subrepo are checked out at the
+    commit stored in `docs/_data/subrepo.lock`, without any network access if
+    this commit is already available locally. Commits of subrepo missing from
+    this file are added to it. Setting environment variable
+    `MKDOCS_SUBREPO_LOCK_UPDATE` pulls every subrepo and updates the file. The
+    commit of a stale subrepo, which could not be fetched, is never changed.
+
+    Already cloned subrepo are fetched according to
+    `subrepo_config["fetch_policy"]`, see
+    [get_fetch_max_age][plugins_fetch.get_fetch_max_age], and git commands
+    accessing the network are killed after `subrepo_config["timeout"]` seconds
+    (default to [SUBREPO_TIMEOUT][plugins_fetch.SUBREPO_TIMEOUT]). Time of the
+    last fetch of each subrepo is stored in
+    [SUBREPO_FETCH_CACHE][plugins_fetch.SUBREPO_FETCH_CACHE].
+
+    If pulling one subrepo fails, its checkout is used as is, see
+    [fetch_or_keep_subrepo][plugins_fetch.fetch_or_keep_subrepo]. If cloning one
+    subrepo fails, the error is raised once every other subrepo are fetched.
+
+    As soon as a subrepo is fetched, its repo file is loaded and validated by
+    a single worker, see [validate_subrepo][plugins_subrepo.validate_subrepo],
+    while other subrepo are still fetched, and until every subrepo is
+    validated. Results are merged in order by
+    [update_subrepo_info][plugins_subrepo.update_subrepo_info].
+
+    If `subrepo_config["recursive"]` is true, the file `subrepo.yaml` of each
+    fetched subrepo, if any, is loaded and its subrepo are fetched too, in the
+    subrepo (in its `subpath` if defined), as its own build would do, and so
+    on. Each git URL is fetched once: other locations of the same subrepo are
+    links to its first location, unless they already are a folder. A subrepo
+    including itself, directly or not, is reported and not fetched again.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        subrepo_dict: Dictionary storing subrepo,
+        path: Absolute path of the location of the cloned subrepo.
+
+    Returns:
+        List of tuples `(subrepo_dict, path)` of nested subrepo, i.e. content of
+        key `subrepo` of the file `subrepo.yaml` of fetched subrepo and their
+        path, in the order they are discovered.
+    """
+    fetcher = init_subrepo_fetcher(env)
+    try:
+        for i_repo, i_root in list_subrepo(subrepo_dict, path):
+            submit_subrepo(fetcher, i_repo, i_root)
+        nested = submit_nested_subrepo(fetcher)
+        fetcher["executor"].shutdown(wait=True)
+        # The worker validates remaining subrepo while the lock is checked
+        fetcher["build"]["fetched"].update(fetcher["futures"], fetcher["links"])
+        save_fetch_times(fetcher)
+        update_subrepo_lock(fetcher)
+    finally:
+        fetcher["executor"].shutdown(wait=True)
+        # Git repos used by the worker are closed once the build ends
+        fetcher["validator"].shutdown(wait=True)
+    return nested
+
+
+def get_fetch_inputs(env: dict) -> tuple:
+    """Return inputs of [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+
+    Markdown pages are not part of these inputs, such that editing them while
+    serving the documentation never fetches subrepo.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+
+    Returns:
+        Tuple of `subrepo` and `subrepo_config` variables, except
+        `refresh_interval` which does not change fetched subrepo, of the value
+        of `MKDOCS_SUBREPO_LOCK_UPDATE`, of the fingerprint of `subrepo.lock`
+        and of which subrepo roots exist.
+    """
+    return (
+        json.dumps(env.variables["subrepo"], sort_keys=True),
+        json.dumps(
+            {
+                i_key: i_value
+                for i_key, i_value in (
+                    env.variables.get("subrepo_config") or {}
+                ).items()
+                if i_key != "refresh_interval"
+            },
+            sort_keys=True,
+        ),
+        os.environ.get("MKDOCS_SUBREPO_LOCK_UPDATE"),
+        get_files_fingerprint(
+            [os.path.join(env.project_dir, "docs", "_data", SUBREPO_LOCK_FILE)]
+        ),
+        tuple(
+            os.path.isdir(i_root)
+            for _, i_root in list_subrepo(
+                env.variables["subrepo"], env.project_dir
+            )
+        ),
+    )
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
@@ -0,0 +1,592 @@
+"""Keep the state of builds across builds, time and trace their phases.
+
+Module of [plugins.py][plugins], see
+[get_state_module][plugins_state.get_state_module].
+"""
+
+# pylint: disable=R0801,C0415
+# - C0415: Import outside toplevel, heavy dependencies are imported on first
+#   use, see `typing.TYPE_CHECKING` below
+
+# Annotations naming lazily imported modules are not evaluated
+from __future__ import annotations
+
+# Time phases of the build within a with statement
+# https://docs.python.org/3/library/contextlib.html
+import contextlib
+
+# Copy results of phases reused across builds
+# https://docs.python.org/3/library/copy.html
+import copy
+
+# Compute the digest of plugins.py and its modules once
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# Unix style pathname pattern expansion
+# https://docs.python.org/3/library/glob.html
+import glob
+
+# Secure hashes and message digests
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+
+# JSON encoder and decoder
+# https://docs.python.org/3/library/json.html
+import json
+
+# Logging facility
+# https://docs.python.org/3/library/logging.html
+import logging
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# System-specific parameters and functions
+# https://docs.python.org/3/library/sys.html
+import sys
+
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
+# Time access and conversions
+# https://docs.python.org/3/library/time.html
+import time
+
+# Module holding the state kept across builds
+# https://docs.python.org/3/library/types.html
+import types
+
+# Names of lazily imported modules used in type hints
+# https://docs.python.org/3/library/typing.html
+import typing
+
+# Git repos kept open across builds
+# docs/_data/plugins_git.py
+from plugins_git import GitContext
+
+# Following dependencies are slow to import and not always needed. They are
+# imported by methods using them, on first use, and only for type hints here.
+if typing.TYPE_CHECKING:
+    # Python Git Library
+    # https://pypi.org/project/GitPython/
+    import git
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+LOG = logging.getLogger("plugins")
+"""The logger facilty, shared by `plugins.py` and its modules."""
+ERR_CLR = "\033[31m"
+"""String coloring error output in red."""
+INFO_CLR = "\033[32m"
+"""String coloring error output in green."""
+RESET_CLR = "\033[0m"
+"""String reseting coloring output."""
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")),
+    "mkdocs_template",
+)
+"""Default directory storing caches shared across builds."""
+PHASE_STATS = {"reused": 0, "run": 0}
+"""Number of phases of the build reused from the last build, or run."""
+PHASE_STATS_GUARD = threading.Lock()
+"""Lock protecting the update of `PHASE_STATS` by subrepo workers."""
+BUILD_STATE_MODULE = "mkdocs_template_build_state"
+"""Name of the module in `sys.modules` storing the state kept across builds."""
+TIMINGS = {}
+"""Time spent, in seconds, and number of calls, by phase of the build."""
+TIMINGS_GUARD = threading.Lock()
+"""Lock protecting the update of `TIMINGS` by concurrent subrepo fetches."""
+TIMINGS_SUMMARY_MAX = 15
+"""Maximum number of phases printed in the timing summary."""
+TRACE = {"events": None, "origin": 0.0, "threads": {}}
+"""Spans recorded by the tracer, or None when it is disabled."""
+TRACE_NULL_SPAN = contextlib.nullcontext()
+"""Context manager returned by `traced` when the tracer is disabled."""
+
+
+def get_plugins_files() -> list:
+    """Return paths of `plugins.py` and of its modules, next to this file.
+
+    Returns:
+        Sorted list of paths of `plugins.py` and `plugins_*.py` files.
+    """
+    return sorted(
+        glob.glob(
+            os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), "plugins*.py"
+            )
+        )
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_plugins_digest() -> str:
+    """Return the SHA256 of the content of `plugins.py` and of its modules.
+
+    Returns:
+        The SHA256 of files returned by
+        [get_plugins_files][plugins_state.get_plugins_files], computed once per
+        import.
+    """
+    digest = hashlib.sha256()
+    for i_file in get_plugins_files():
+        with open(i_file, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def get_state_module() -> types.ModuleType:
+    """Return the module storing the state shared across builds and configs.
+
+    `mkdocs serve` runs [define_env][plugins.define_env] again on every
+    reload, after mkdocs-macros-plugin imported `plugins.py` again, which
+    imports its modules again and resets every module variable. Likewise, each
+    `mkdocs.yml` of subrepo included by mkdocs-monorepo-plugin loads its own
+    copy of `plugins.py`. The state is thus stored in a module registered in
+    `sys.modules` as [BUILD_STATE_MODULE][plugins_state.BUILD_STATE_MODULE],
+    shared by every copy of `plugins.py` and its modules with the same
+    content. It is emptied when this content changes, as phases results may
+    then differ, but not during a build: the config of a monorepo subrepo
+    shipping another version of `plugins.py` keeps using the state of the
+    build including it, see [get_parent_build][plugins_state.get_parent_build].
+
+    Returns:
+        Module with attributes `plugins`, see
+        [get_plugins_digest][plugins_state.get_plugins_digest], `phases`,
+        see [get_build_state][plugins_state.get_build_state], `git_context`, the
+        [GitContext][plugins_git.GitContext] of the process, `build`, see
+        [get_parent_build][plugins_state.get_parent_build], `build_lock`, lock
+        held while `build` is set or subrepo are refreshed, and `refresher`,
+        see [update_refresher][plugins_refresh.update_refresher].
+    """
+    if BUILD_STATE_MODULE not in sys.modules:
+        sys.modules[BUILD_STATE_MODULE] = types.ModuleType(BUILD_STATE_MODULE)
+    state_module = sys.modules[BUILD_STATE_MODULE]
+    if (
+        getattr(state_module, "plugins", None) != get_plugins_digest()
+        and getattr(state_module, "build", None) is None
+    ):
+        if getattr(state_module, "git_context", None):
+            state_module.git_context.close()
+        if getattr(state_module, "refresher", None):
+            state_module.refresher.stop()
+        state_module.plugins = get_plugins_digest()
+        state_module.phases = {}
+        state_module.git_context = GitContext()
+        state_module.build = None
+        state_module.build_lock = threading.Lock()
+        state_module.refresher = None
+    return state_module
+
+
+GIT_CONTEXT = get_state_module().git_context
+"""Git repos shared by every method during a build, and by monorepo configs."""
+
+
+def get_build_state() -> dict:
+    """Return results of phases kept by the process across builds.
+
+    See [get_state_module][plugins_state.get_state_module]. Phases of distinct
+    repos, e.g. of monorepo configs, are named after the repo.
+
+    Returns:
+        Dictionary which keys are names of phases and values are dictionaries
+        with keys `inputs` and `result`, see
+        [run_phase][plugins_state.run_phase].
+    """
+    return get_state_module().phases
+
+
+def get_parent_build(env: dict) -> dict:
+    """Return the build the config of a monorepo subrepo is part of, if any.
+
+    Each `mkdocs.yml` of subrepo included with `!include` by
+    mkdocs-monorepo-plugin is rendered from the same template and runs
+    [define_env][plugins.define_env] again, once the config of the repo
+    including it did. Such a config is detected as its root is inside the
+    root of the build in progress.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary.
+
+    Returns:
+        Dictionary of the build in progress, with keys `root`, the root of the
+        repo including subrepo, and `fetched`, the set of subrepo roots
+        already cloned or pulled by the build, or None if `env` is not the
+        config of a subrepo.
+    """
+    build = get_state_module().build
+    project_dir = os.path.abspath(env.project_dir)
+    if (
+        build
+        and project_dir != build["root"]
+        and os.path.commonpath([project_dir, build["root"]]) == build["root"]
+    ):
+        return build
+    return None
+
+
+def start_build(env: dict) -> None:
+    """Start the build of a repo, which configs of monorepo subrepo are part of.
+
+    See [get_parent_build][plugins_state.get_parent_build]. The build ends
+    with [end_build][plugins_state.end_build], run by
+    [on_post_build][plugins.on_post_build], by mkdocs event `build_error` if
+    the build fails and by [define_env][plugins.define_env] if it raises,
+    such that a failed build does not suspend the refresher of subrepo.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary.
+    """
+    state_module = get_state_module()
+    with state_module.build_lock:
+        state_module.build = {
+            "root": os.path.abspath(env.project_dir),
+            "fetched": set(),
+        }
+    events = getattr(env.conf["plugins"], "events", {})
+    if "build_error" in events:
+        events["build_error"].append(end_build)
+
+
+def end_build(**kwargs) -> None:
+    """End the build in progress and close git repos kept open for it.
+
+    Also hook of mkdocs event `build_error`, see
+    [start_build][plugins_state.start_build].
+
+    Arguments:
+        kwargs: Arguments of the event, i.e. `error`.
+    """
+    # pylint: disable=W0613
+    # - W0613: Unused argument, mkdocs passes `error` to hooks
+    state_module = get_state_module()
+    with state_module.build_lock:
+        state_module.build = None
+    GIT_CONTEXT.close()
+
+
+def get_files_fingerprint(paths: list) -> tuple:
+    """Return a cheap fingerprint of files, without reading them.
+
+    Arguments:
+        paths: List of paths of files or folders.
+
+    Returns:
+        Tuple with the path, modification time and size of each file, or
+        only its path if it does not exist.
+    """
+    fingerprint = []
+    for i_path in paths:
+        try:
+            stat = os.stat(i_path)
+            fingerprint.append((i_path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append((i_path,))
+    return tuple(fingerprint)
+
+
+def run_phase(name: str, get_inputs, compute):
+    """Run a phase of the build, unless its inputs did not change.
+
+    Inputs of the phase are compared to inputs recorded by the last build
+    done by the process, see [get_build_state][plugins_state.get_build_state].
+    If they are the same, the result of the last build is returned instead of
+    running the phase again. Inputs are recorded once the phase ran, such
+    that files updated by the phase itself do not trigger it again.
+
+    Arguments:
+        name: Unique name of the phase,
+        get_inputs: Method without arguments returning inputs of the phase,
+            which can be compared with `==`,
+        compute: Method without arguments running the phase and returning
+            its result.
+
+    Returns:
+        A copy of the result of the phase, which can be modified.
+    """
+    state = get_build_state()
+    if name in state and state[name]["inputs"] == get_inputs():
+        with PHASE_STATS_GUARD:
+            PHASE_STATS["reused"] += 1
+        return copy.deepcopy(state[name]["result"])
+    with PHASE_STATS_GUARD:
+        PHASE_STATS["run"] += 1
+    result = compute()
+    state[name] = {"inputs": get_inputs(), "result": copy.deepcopy(result)}
+    return result
+
+
+def record_timing(phase: str, duration: float) -> None:
+    """Add the duration of a call of a phase to `TIMINGS`.
+
+    See [TIMINGS][plugins_state.TIMINGS].
+
+    Arguments:
+        phase: Name of the phase,
+        duration: Time spent in the call, in seconds.
+    """
+    with TIMINGS_GUARD:
+        timing = TIMINGS.setdefault(phase, {"seconds": 0.0, "calls": 0})
+        timing["seconds"] += duration
+        timing["calls"] += 1
+
+
+def start_trace() -> None:
+    """Enable the tracer if environment variable `MKDOCS_TRACE_FILE` is set.
+
+    Once enabled, [traced][plugins_state.traced] spans and
+    [timed][plugins_state.timed] phases are recorded until
+    [write_trace][plugins_state.write_trace] is called.
+    """
+    TRACE["events"] = None
+    if os.environ.get("MKDOCS_TRACE_FILE"):
+        TRACE.update(events=[], origin=time.perf_counter(), threads={})
+
+
+def record_span(name: str, category: str, start: float, args: dict) -> None:
+    """Record a span ending now, if the tracer is enabled.
+
+    Arguments:
+        name: Name of the span,
+        category: Category of the span, e.g. `phase` or `subrepo`,
+        start: Value of `time.perf_counter()` when the span started,
+        args: Dictionary of values shown with the span in trace viewers.
+    """
+    events = TRACE["events"]
+    if events is None:
+        return
+    end = time.perf_counter()
+    thread = threading.current_thread()
+    TRACE["threads"][thread.ident] = thread.name
+    # Appending to a list is atomic, spans of workers need no lock
+    events.append(
+        {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - TRACE["origin"]) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+    )
+
+
+@contextlib.contextmanager
+def trace_span(name: str, category: str, args: dict):
+    """Context manager recording its block as a span.
+
+    Arguments:
+        name: Name of the span,
+        category: Category of the span,
+        args: Dictionary of values shown with the span in trace viewers.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, category, start, args)
+
+
+def traced(name: str, category: str = "subrepo", **args):
+    """Return a context manager recording its block as a span.
+
+    When the tracer is disabled, a shared context manager doing nothing is
+    returned, such that tracing costs a single test.
+
+    Arguments:
+        name: Name of the span,
+        category: Category of the span,
+        **args: Values shown with the span in trace viewers.
+
+    Returns:
+        A context manager.
+    """
+    if TRACE["events"] is None:
+        return TRACE_NULL_SPAN
+    return trace_span(name, category, args)
+
+
+def write_trace(env: dict) -> None:
+    """Write recorded spans in the Chrome trace event format.
+
+    The file is set by environment variable `MKDOCS_TRACE_FILE`, relative to
+    the root of the repo, and can be opened in `chrome://tracing` or
+    [Perfetto](https://ui.perfetto.dev).
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+    """
+    events = TRACE["events"]
+    if events is None:
+        return
+    TRACE["events"] = None
+    trace_file = os.path.join(
+        env.project_dir, os.path.expanduser(os.environ["MKDOCS_TRACE_FILE"])
+    )
+    threads = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": i_tid,
+            "args": {"name": i_name},
+        }
+        for i_tid, i_name in TRACE["threads"].items()
+    ]
+    os.makedirs(os.path.dirname(trace_file), exist_ok=True)
+    with open(trace_file, "w", encoding="UTF-8") as file:
+        json.dump(
+            {"traceEvents": threads + events, "displayTimeUnit": "ms"}, file
+        )
+    print(
+        f"{INFO_CLR}INFO [macros] - Trace of {len(events)} spans written to "
+        f"{trace_file}{RESET_CLR}"
+    )
+
+
+@contextlib.contextmanager
+def timed(phase: str):
+    """Context manager recording the time spent in its block.
+
+    The block is also recorded as a span by the tracer, if enabled, see
+    [traced][plugins_state.traced].
+
+    Arguments:
+        phase: Name of the phase, see
+            [record_timing][plugins_state.record_timing].
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(phase, time.perf_counter() - start)
+        record_span(phase, "phase", start, {})
+
+
+def timed_call(phase: str, method, *args, **kwargs):
+    """Call a method and record the time spent in it.
+
+    Arguments:
+        phase: Name of the phase, see
+            [record_timing][plugins_state.record_timing],
+        method: Method to call,
+        *args: Positional arguments of the method,
+        **kwargs: Keyword arguments of the method.
+
+    Returns:
+        The value returned by the method.
+    """
+    with timed(phase):
+        return method(*args, **kwargs)
+
+
+def get_timings() -> list:
+    """Return phases of the build sorted from the slowest to the fastest.
+
+    Returns:
+        List of dictionaries with keys `phase`, `seconds` and `calls`.
+    """
+    with TIMINGS_GUARD:
+        timings = [
+            {"phase": i_phase, **i_timing}
+            for i_phase, i_timing in TIMINGS.items()
+        ]
+    return sorted(timings, key=lambda i_timing: -i_timing["seconds"])
+
+
+def report_timings(env: dict) -> None:
+    """Print the slowest phases of the build and write every timings.
+
+    Timings are written as JSON in the file set by key `timings_file` of
+    `profiling` in `docs/_data/vars.yml`, if any, relative to the root of the
+    repo, such that the CI can keep it to track regressions across builds.
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+    """
+    timings = get_timings()
+    print(f"{INFO_CLR}INFO [macros] - Time spent by phase:{RESET_CLR}")
+    for i_timing in timings[:TIMINGS_SUMMARY_MAX]:
+        print(
+            f"{INFO_CLR}INFO [macros] - "
+            f"{i_timing['seconds'] * 1000:10.1f} ms "
+            f"{i_timing['calls']:4d} x {i_timing['phase']}{RESET_CLR}"
+        )
+    if len(timings) > TIMINGS_SUMMARY_MAX:
+        print(
+            f"{INFO_CLR}INFO [macros] - ... and "
+            f"{len(timings) - TIMINGS_SUMMARY_MAX} faster phases{RESET_CLR}"
+        )
+
+    timings_file = env.variables.get("profiling", {}).get("timings_file")
+    if timings_file:
+        timings_file = os.path.join(
+            env.project_dir, os.path.expanduser(timings_file)
+        )
+        os.makedirs(os.path.dirname(timings_file), exist_ok=True)
+        with open(timings_file, "w", encoding="UTF-8") as file:
+            json.dump(
+                {
+                    "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "commit": get_head_commit(env.project_dir),
+                    "timings": timings,
+                },
+                file,
+                indent=2,
+            )
+
+
+def get_head_commit(repo_path: str) -> str:
+    """Return the SHA of the commit checked out in a repo, if any.
+
+    `HEAD` is resolved from the files of the repo rather than through the
+    persistent `git cat-file` process of its `git.Repo`, which is not thread
+    safe, as subrepo are validated while the build reads their `HEAD`.
+
+    Arguments:
+        repo_path: Absolute path of the repo.
+
+    Returns:
+        The SHA of `HEAD`, or None if the repo does not exist or has no commit.
+    """
+    import git
+
+    try:
+        return git.SymbolicReference.dereference_recursive(
+            GIT_CONTEXT.repo(repo_path), "HEAD"
+        )
+    except (git.exc.GitError, ValueError):
+        return None
+
+
+def get_tags_fingerprint(git_repo: git.Repo) -> tuple:
+    """Return a cheap fingerprint of the tags of a repo, without git.
+
+    Arguments:
+        git_repo: Git python object of the repo.
+
+    Returns:
+        Fingerprint, see
+        [get_files_fingerprint][plugins_state.get_files_fingerprint], of file
+        `packed-refs` and of every loose tag.
+    """
+    paths = [os.path.join(git_repo.common_dir, "packed-refs")]
+    for i_root, _, i_files in os.walk(
+        os.path.join(git_repo.common_dir, "refs", "tags")
+    ):
+        paths += sorted(os.path.join(i_root, i_file) for i_file in i_files)
+    return get_files_fingerprint(paths)
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
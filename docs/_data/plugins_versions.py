@@ -0,0 +1,213 @@
+"""Write the versions of the documentation for mike.
+
+Module of [plugins.py][plugins], see
+[update_version][plugins_versions.update_version].
+"""
+
+# pylint: disable=R0801
+
+# Annotations naming lazily imported modules are not evaluated
+from __future__ import annotations
+
+# Bind arguments of the phase writing versions
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# JSON encoder and decoder
+# https://docs.python.org/3/library/json.html
+import json
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Regular expression operations
+# https://docs.python.org/3/library/re.html
+import re
+
+# Names of lazily imported modules used in type hints
+# https://docs.python.org/3/library/typing.html
+import typing
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import GIT_CONTEXT, get_tags_fingerprint, run_phase
+
+# Following dependencies are slow to import and not always needed. They are
+# imported by methods using them, on first use, and only for type hints here.
+if typing.TYPE_CHECKING:
+    # Python Git Library
+    # https://pypi.org/project/GitPython/
+    import git
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+VERSIONS_FILE = "versions.json"
+"""Name of the file listing versions of the documentation for mike."""
+SEMVER_REGEX = re.compile(
+    r"^(?:.*v)?(?P<major>0|[1-9][0-9]*)\.(?P<minor>0|[1-9][0-9]*)"
+    r"(?:\.(?P<patch>0|[1-9][0-9]*))?"
+    r"(?:-(?P<prerelease>[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?"
+    r"(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?$"
+)
+"""Semantic versioning grammar of tags, with an optional `v` prefix."""
+
+
+def get_tag_names(git_repo: git.Repo) -> list:
+    """List names of every tag of a repo with a single git command.
+
+    Arguments:
+        git_repo: Git repo object.
+
+    Returns:
+        List of tag names, without `refs/tags/`.
+    """
+    return git_repo.git.for_each_ref(
+        "--format=%(refname:strip=2)", "refs/tags"
+    ).splitlines()
+
+
+def parse_version_tag(tag_name: str):
+    """Parse a tag name with the semantic versioning grammar.
+
+    Arguments:
+        tag_name: Name of the tag, such as `v1.2.3` or `v1.2.3-rc.1`.
+
+    Returns:
+        A tuple `(major, minor, key, title)` where `key` sorts versions by
+        semantic versioning precedence and `title` is the version without
+        prefix nor build metadata, or None if the tag is not a version.
+    """
+    match = SEMVER_REGEX.match(tag_name)
+    if not match:
+        return None
+    major = int(match.group("major"))
+    minor = int(match.group("minor"))
+    patch = int(match.group("patch") or 0)
+    title = f"{major}.{minor}.{patch}"
+    prerelease = match.group("prerelease")
+    if prerelease:
+        title = f"{title}-{prerelease}"
+        # Numeric identifiers have lower precedence than alphanumeric ones
+        release_key = (
+            0,
+            tuple(
+                (0, int(i_id), "") if i_id.isdigit() else (1, 0, i_id)
+                for i_id in prerelease.split(".")
+            ),
+        )
+    else:
+        # A release has higher precedence than its prereleases
+        release_key = (1, ())
+    return major, minor, (major, minor, patch, release_key), title
+
+
+def build_mike_versions(tag_names: list) -> list:
+    """Build the content of `versions.json` from tag names.
+
+    Tags are grouped by `major.minor`, titled with the latest version of the
+    group, and groups are sorted numerically from the latest to the oldest.
+    Tags which are not versions are ignored.
+
+    Arguments:
+        tag_names: List of tag names.
+
+    Returns:
+        List of versions as expected by mike in `versions.json`.
+    """
+    latest = {}
+    for i_tag in tag_names:
+        version = parse_version_tag(i_tag)
+        if version is None:
+            continue
+        major, minor, key, title = version
+        if (major, minor) not in latest or latest[(major, minor)][0] < key:
+            latest[(major, minor)] = (key, title)
+
+    mike_version = [
+        {
+            "version": f"{i_major}.{i_minor}",
+            "title": latest[(i_major, i_minor)][1],
+            "aliases": [],
+        }
+        for i_major, i_minor in sorted(latest, reverse=True)
+    ]
+    if mike_version:
+        mike_version[0]["aliases"].append("latest")
+    return mike_version
+
+
+def get_versions_output(env: dict) -> str:
+    """Return where `versions.json` should be written, if anywhere.
+
+    The output is set by key `output` of `extra.version` in `mkdocs.yml`,
+    either `docs` (default) to write it in the folder `docs` or `site_dir` to
+    write it in the built site once the build is done.
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+
+    Returns:
+        `docs`, `site_dir`, or None if the version provider is not mike.
+    """
+    if (
+        "version" not in env.variables
+        or "provider" not in env.variables["version"]
+        or env.variables["version"]["provider"] != "mike"
+    ):
+        return None
+    return env.variables["version"].get("output", "docs")
+
+
+def write_versions_file(directory: str) -> None:
+    """Write `versions.json` in a folder, only if its content changed.
+
+    Leaving an up to date file untouched avoids `mkdocs serve` to detect a
+    change in the folder `docs` and to rebuild the documentation again.
+
+    Arguments:
+        directory: Absolute path of the folder where `versions.json` is.
+    """
+    git_repo = GIT_CONTEXT.repo()
+    content = json.dumps(build_mike_versions(get_tag_names(git_repo)), indent=2)
+    versions_file = os.path.join(directory, VERSIONS_FILE)
+    if os.path.isfile(versions_file):
+        with open(versions_file, encoding="UTF-8") as version_file:
+            if version_file.read() == content:
+                return
+    os.makedirs(directory, exist_ok=True)
+    with open(versions_file, "w", encoding="UTF-8") as version_file:
+        version_file.write(content)
+
+
+def update_version(env: dict) -> None:
+    """Parse every tags of the repo to build a `docs/versions.json`.
+
+    To emulate mike version support for gitlab, this method will parse every
+    tags of the current repo holding the current documentation to create a file
+    `versions.json` which will be put in folder `docs`.
+
+    This is mainly used for the CI to build a documentation per repo tags.
+
+    If `versions.json` should be put in the built site instead, see
+    [get_versions_output][plugins_versions.get_versions_output], it is written
+    by [on_post_build][plugins.on_post_build].
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+    """
+    if get_versions_output(env) == "docs":
+        directory = os.path.join(env.project_dir, "docs")
+        run_phase(
+            f"versions {directory}",
+            lambda: (directory, get_tags_fingerprint(GIT_CONTEXT.repo())),
+            functools.partial(write_versions_file, directory),
+        )
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
@@ -17,248 +17,211 @@ the same `mkdocs.yml` file for multiple repos and use variables files in
 `docs/_data/`
 """
 
-# pylint: disable=R0801
+# pylint: disable=R0801,C0415
+# - C0415: Import outside toplevel, heavy dependencies are imported on first
+#   use, see `typing.TYPE_CHECKING` below
+
+# Annotations naming lazily imported modules are not evaluated
+from __future__ import annotations
+
+# Count subrepo by fetch status
+# https://docs.python.org/3/library/collections.html
+import collections
+
+# Bind arguments of phases of the build, cache HTML of markdown strings
+# https://docs.python.org/3/library/functools.html
+import functools
 
 # JSON encoder and decoder
 # https://docs.python.org/3/library/json.html
 import json
 
-# Logging facility
-# https://docs.python.org/3/library/logging.html
-import logging
-
 # Miscellaneous operating system interfaces
 # https://docs.python.org/3/library/os.html
 import os
 
-# Regular expression operations
-# https://docs.python.org/3/library/re.html
-import re
-
 # System-specific parameters and functions
 # https://docs.python.org/3/library/sys.html
 import sys
 
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
 # Time access and conversions
 # https://docs.python.org/3/library/time.html
 import time
 
-# Python Git Library
-# https://pypi.org/project/GitPython/
-import git
-
-# Python implementation of Markdown
-# https://pypi.org/project/markdown/
-import markdown
+# Names of lazily imported modules used in type hints
+# https://docs.python.org/3/library/typing.html
+import typing
+
+# Following dependencies are slow to import and not always needed, e.g. when
+# data files are cached or when macro `to_html` is not used. They are imported
+# by methods using them, on first use, and only for type hints here:
+# - Python Git Library: https://pypi.org/project/GitPython/
+# - Python implementation of Markdown: https://pypi.org/project/markdown/
+if typing.TYPE_CHECKING:
+    # Python Git Library
+    # https://pypi.org/project/GitPython/
+    import git
+
+# Modules of this file are next to it, in `docs/_data`, and imported from this
+# folder, which is in `sys.path` only while importing them. Modules imported by
+# a previous build, or by the copy of this file of another repo, e.g. a
+# subrepo, are removed first to import the ones next to this file.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+try:
+    for i_module in (
+        "plugins_fetch",
+        "plugins_git",
+        "plugins_nav",
+        "plugins_refresh",
+        "plugins_schema",
+        "plugins_snapshot",
+        "plugins_state",
+        "plugins_subrepo",
+        "plugins_versions",
+    ):
+        sys.modules.pop(i_module, None)
+
+    # Subrepo cloned or pulled concurrently
+    # docs/_data/plugins_fetch.py
+    from plugins_fetch import (
+        SUBREPO_FETCH_STATUS,
+        fetch_all_subrepo,
+        get_fetch_inputs,
+    )
 
-# YAML parser and emitter for Python
-# https://pypi.org/project/PyYAML/
-import yaml
+    # Git repos kept open across builds
+    # docs/_data/plugins_git.py
+    from plugins_git import has_commit
+
+    # Index of the entries of the `nav` key
+    # docs/_data/plugins_nav.py
+    from plugins_nav import update_nav
+
+    # Subrepo refreshed in the background while serving
+    # docs/_data/plugins_refresh.py
+    from plugins_refresh import update_refresher
+
+    # Data files validated by compiled schemas and cached
+    # docs/_data/plugins_schema.py
+    from plugins_schema import (
+        DATA_CACHE_STATS,
+        SCHEMA_FILES,
+        load_yaml_file,
+        write_data_cache_file,
+    )
 
-# Python lib/cli for JSON/YAML schema validation
-# https://pypi.org/project/pykwalify/
-from pykwalify.core import Core as yamlschema
+    # Snapshot of the configuration reused by unchanged builds
+    # docs/_data/plugins_snapshot.py
+    from plugins_snapshot import (
+        apply_snapshot,
+        copy_variables,
+        get_build_fingerprint,
+        get_setup_commands,
+        load_snapshot,
+        save_snapshot,
+        take_snapshot,
+    )
 
-# pylint: disable=W0105
-# - W0105: String statement has no effect
-LOG = logging.getLogger(__name__)
-"""The logger facilty."""
-ERR_CLR = "\033[31m"
-"""String coloring error output in red."""
-INFO_CLR = "\033[32m"
-"""String coloring error output in green."""
-RESET_CLR = "\033[0m"
-"""String reseting coloring output."""
-
-
-def add_internal_to_nav(
-    env: dict,
-    nav: dict,
-    repo_dict: dict,
-    repo_parent: list,
-    nav_parent: list = None,
-) -> None:
-    """Add internal subrepo to `nav` key of mkdocs.yml for monorepo.
-
-    This method recursively parse `nav_parent` arguments to know where to
-    include the internal subrepo into `nav` key.
-
-    Once determined, add the subrepo as a entry to the `nav` key, with the
-    format required by
-    [mkdocs-monorepo-plugin](https://github.com/backstage/mkdocs-monorepo-plugin).
-
-    Args:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        nav : Navigation dictionary (subpart of it if called
-            recursively)
-        repo_dict : Repo dictionary from `subrepo.yml` file in `docs/_data/`
-        repo_parent : List of keys storing parent keys of the current
-            `repo_dict` from `subrepo.yml` file in `docs/_data`
-        nav_parent : List of keys storing parents `nav_entry` keys of the
-            current `repo_dict` from `subrepo.yml` file in `docs/_data`
-    """
-    if nav_parent:
-        for i_nav in nav:
-            # "nav_entry" is a key of current parsed `nav`
-            if nav_parent[0] in i_nav:
-                for i_key in i_nav:
-                    add_internal_to_nav(
-                        env,
-                        i_nav[i_key],
-                        repo_dict,
-                        repo_parent,
-                        nav_parent[1:],
-                    )
-            # "nav_entry" is a subkey of current parsed `nav`
-            elif nav_parent[0] in yaml.dump(i_nav):
-                for i_key in i_nav:
-                    add_internal_to_nav(
-                        env,
-                        i_nav[i_key],
-                        repo_dict,
-                        repo_parent,
-                        nav_parent[0:],
-                    )
-    else:
-        mkdocs_path = env.project_dir
-        for i_parent in repo_parent:
-            mkdocs_path = os.path.join(mkdocs_path, i_parent)
-        mkdocs_path = os.path.join(mkdocs_path, repo_dict["name"])
-        if "subpath" in repo_dict:
-            mkdocs_path = os.path.join(mkdocs_path, repo_dict["subpath"])
-        mkdocs_path = os.path.join(mkdocs_path, "mkdocs.yml")
-        nav.append({repo_dict["nav_entry"]: f"!include {mkdocs_path}"})
+    # State kept across builds, timing and tracing of phases
+    # docs/_data/plugins_state.py
+    from plugins_state import (
+        CACHE_DIR,
+        ERR_CLR,
+        GIT_CONTEXT,
+        INFO_CLR,
+        LOG,
+        PHASE_STATS,
+        RESET_CLR,
+        TIMINGS,
+        end_build,
+        get_files_fingerprint,
+        get_parent_build,
+        record_span,
+        record_timing,
+        report_timings,
+        run_phase,
+        start_build,
+        start_trace,
+        timed_call,
+        write_trace,
+    )
 
+    # Data files of subrepo merged into the configuration
+    # docs/_data/plugins_subrepo.py
+    from plugins_subrepo import (
+        PIPELINE_STATS,
+        SRC_PATHS,
+        SUBREPO_PIPELINE,
+        update_logo_src_repo,
+        update_nested_subrepo,
+        update_subrepo,
+    )
 
-def add_external_to_nav(
-    env: dict, nav: dict, repo_dict: dict, repo_parent: list, nav_parent: list
-) -> None:
-    """Add external subrepo to `nav` key of mkdocs.yml.
+    # Versions of the documentation for mike
+    # docs/_data/plugins_versions.py
+    from plugins_versions import (
+        get_versions_output,
+        update_version,
+        write_versions_file,
+    )
+finally:
+    sys.path.remove(os.path.dirname(os.path.abspath(__file__)))
 
-    This method recursively parse `nav_parent` arguments to know where to
-    include the external subrepo into `nav` key.
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+FIRST_COMMIT_CACHE = "first_commit.json"
+"""Name of the file in `CACHE_DIR` storing root commits of repos and years."""
+SRC_PATHS_MARKER = "# plugins.py:src_paths"
+"""Comment ending the mkdocstrings setup command adding `src_path`."""
+TO_HTML_CACHE_SIZE = 1024
+"""Maximum number of markdown strings which HTML is kept by `to_html`."""
+
+
+def get_markdown_converter(
+    extensions: list = None,
+    extension_configs: dict = None,
+    cache_size: int = TO_HTML_CACHE_SIZE,
+):
+    """Return a method converting markdown strings to HTML.
+
+    Building a Markdown instance, and its extensions, costs more than
+    converting a short string such as the description of a repo. The returned
+    method thus builds a single instance on first use, then resets it before
+    each conversion. Conversions are serialized, as a Markdown instance holds
+    the state of the conversion, and the HTML of the last converted strings is
+    kept.
 
-    Once determined, add the subrepo as a entry to the `nav` key, with the
-    `online_url` key of the current subrepo defined with `repo_dict` in file
-    `subrepo.yml` in `docs/_data`.
+    Arguments:
+        extensions: Markdown extensions, none by default,
+        extension_configs: Configuration of these extensions,
+        cache_size: Number of strings which HTML is kept.
 
-    Args:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        nav : Navigation dictionary (subpart of it if called recursively)
-        repo_dict : Repo dictionary from `subrepo.yml` file in `docs/_data/`
-        repo_parent : List of keys storing parent keys of the current
-            `repo_dict` from `subrepo.yml` file in `docs/_data`
-        nav_parent : List of keys storing parents `nav_entry` keys of the
-            current `repo_dict` from `subrepo.yml` file in `docs/_data`
+    Returns:
+        A method converting a markdown string to HTML.
     """
-    if nav_parent:
-        for i_nav in nav:
-            if nav_parent[0] in i_nav:
-                for i_key in i_nav:
-                    add_external_to_nav(
-                        env,
-                        i_nav[i_key],
-                        repo_dict,
-                        repo_parent,
-                        nav_parent[1:],
+    # Markdown instance, built on first use
+    instance = []
+    lock = threading.Lock()
+
+    @functools.lru_cache(maxsize=cache_size)
+    def convert(text: str) -> str:
+        import markdown
+
+        with lock:
+            if not instance:
+                instance.append(
+                    markdown.Markdown(
+                        extensions=extensions or [],
+                        extension_configs=extension_configs or {},
                     )
-    elif repo_dict["online_url"].startswith("/"):
-        nav.append(
-            {
-                repo_dict["nav_entry"]: repo_dict["online_url"].replace(
-                    "/", "../", 1
                 )
-            }
-        )
-    else:
-        nav.append({repo_dict["nav_entry"]: repo_dict["online_url"]})
-
+            return instance[0].reset().convert(text)
 
-def add_nav_entry(nav: list, nav_parent: list = None) -> None:
-    """Create missing entry into `nav` key of `env.conf`.
-
-    Recursively parse list `nav_parent` and create missing entry into key `nav`
-    of mkdocs.yml.
-
-    Args:
-        nav : Navigation dictionary (subpart of it if called recursively)
-        nav_parent : List of keys storing parents `nav_entry` keys
-    """
-    entry = {}
-
-    for i_nav in nav:
-        if nav_parent[0] in i_nav:
-            entry = i_nav
-
-    if not entry:
-        entry = {nav_parent[0]: []}
-        nav.append(entry)
-
-    if len(nav_parent[1:]) == 0:
-        return
-    add_nav_entry(entry[nav_parent[0]], nav_parent[1:])
-
-
-def update_nav(
-    env: dict,
-    repo_dict: dict,
-    repo_parent: list = None,
-    nav_parent: list = None,
-    first_iteration=False,
-) -> None:
-    """Meta method which dynamically update the `nav` key of `env.conf`.
-
-    Recursively parse `repo_dict` (provided from `subrepo.yml` file in
-    `docs/_data`), depending on the content of the keys, method will:
-
-    - Update the list of `nav_parent` and `repo_parent`,
-    - Call [add_nav_entry][plugins.add_nav_entry] to add missing entry to `nav`
-      key of `mkdocs.yml`,
-    - Call [add_external_to_nav][plugins.add_external_to_nav] to add external
-      subrepo to `nav` key of `mkdocs.yml`,
-    - Call [add_internal_to_nav][plugins.add_internal_to_nav] to add internal
-      subrepo to `nav` key of `mkdocs.yml`,
-    - Recursively call itself.
-
-    Args:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        repo_dict : Repo dictionary from `subrepo.yml` file in `docs/_data/`
-        repo_parent : List of keys storing parent keys of the current
-            `repo_dict` from `subrepo.yml` file in `docs/_data`
-        nav_parent : List of keys storing parents `nav_entry` keys of the
-            current `repo_dict` from `subrepo.yml` file in `docs/_data`
-        first_iteration : Simple boolean to know if it is the first recursive
-            call of the method.
-    """
-    for i_key in repo_dict:
-        if not nav_parent or first_iteration:
-            nav_parent = []
-
-        if not repo_parent or first_iteration:
-            repo_parent = []
-
-        if i_key == "nav_entry":
-            nav_parent.append(repo_dict["nav_entry"])
-        elif i_key == "internal":
-            for i_repo in repo_dict["internal"]:
-                if nav_parent[0] not in yaml.dump(env.conf["nav"]):
-                    add_nav_entry(env.conf["nav"], nav_parent)
-                add_internal_to_nav(
-                    env, env.conf["nav"], i_repo, repo_parent, nav_parent
-                )
-        elif i_key == "external":
-            for i_repo in repo_dict["external"]:
-                if nav_parent[0] not in yaml.dump(env.conf["nav"]):
-                    add_nav_entry(env.conf["nav"], nav_parent)
-                add_external_to_nav(
-                    env, env.conf["nav"], i_repo, repo_parent, nav_parent
-                )
-        else:
-            repo_parent.append(i_key)
-            update_nav(env, repo_dict[i_key], repo_parent, nav_parent)
+    return convert
 
 
 def get_repo_slug(env: dict, git_repo: git.Repo) -> str:
@@ -390,6 +353,64 @@ def set_site_url(env: dict, repo_slug: str) -> None:
             env.conf["site_url"] = site_url
 
 
+def get_first_commit_year(git_repo: git.Repo) -> str:
+    """Return the year of the first commit of the current branch.
+
+    First commits are the root commits reachable from `HEAD`, whatever the
+    name of the branch and the content of the reflog. Root commits of a repo
+    and the year of each root commit are cached in
+    [FIRST_COMMIT_CACHE][plugins.FIRST_COMMIT_CACHE], such that git is only
+    asked again when `HEAD` moved, and then only about new commits.
+
+    Arguments:
+        git_repo: Git python object of the current repo.
+
+    Returns:
+        The year of the oldest root commit, or the current year if the repo
+        has no commit yet.
+    """
+    try:
+        head = git_repo.head.commit.hexsha
+    except ValueError:
+        return time.strftime("%Y", time.localtime())
+
+    cache_file = os.path.join(os.path.expanduser(CACHE_DIR), FIRST_COMMIT_CACHE)
+    try:
+        with open(cache_file, encoding="UTF-8") as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        cache = {}
+    cache_content = json.dumps(cache, sort_keys=True)
+    years = cache.setdefault("years", {})
+    repo_state = cache.setdefault("repos", {}).setdefault(git_repo.git_dir, {})
+
+    last_head = repo_state.get("head")
+    if last_head != head:
+        if (
+            last_head
+            and has_commit(git_repo, last_head)
+            and git_repo.is_ancestor(last_head, head)
+        ):
+            # Only commits added since the last build can hold new roots
+            roots = set(repo_state["roots"]) | set(
+                git_repo.git.rev_list(
+                    "--max-parents=0", head, f"^{last_head}"
+                ).split()
+            )
+        else:
+            roots = git_repo.git.rev_list("--max-parents=0", head).split()
+        repo_state.update({"head": head, "roots": sorted(roots)})
+
+    for i_root in repo_state["roots"]:
+        if i_root not in years:
+            years[i_root] = time.strftime(
+                "%Y", time.gmtime(git_repo.commit(i_root).committed_date)
+            )
+    if json.dumps(cache, sort_keys=True) != cache_content:
+        write_data_cache_file(cache_file, cache)
+    return min(years[i_root] for i_root in repo_state["roots"])
+
+
 def set_copyright(env: dict, git_repo: git.Repo) -> None:
     """Update content of the `copyright` key in `env.conf`.
 
@@ -413,13 +434,7 @@ def set_copyright(env: dict, git_repo: git.Repo) -> None:
     if (
         "copyright" not in env.conf or not env.conf["copyright"]
     ) and "copyright" in env.variables:
-        if git_repo.branches and git_repo.branches.master:
-            first_date = git_repo.commit(
-                git_repo.branches.master.log()[0].newhexsha
-            ).committed_date
-            first_year = time.strftime("%Y", time.gmtime(first_date))
-        else:
-            first_year = time.strftime("%Y", time.localtime())
+        first_year = get_first_commit_year(git_repo)
         curr_year = time.strftime("%Y", time.localtime())
 
         if first_year == curr_year:
@@ -427,7 +442,7 @@ def set_copyright(env: dict, git_repo: git.Repo) -> None:
         else:
             env.variables[
                 "date_copyright"
-            ] = f"Copyright &copy; {curr_year} - {curr_year}"
+            ] = f"Copyright &copy; {first_year} - {curr_year}"
 
         env.conf[
             "copyright"
@@ -561,7 +576,7 @@ def set_config(env: dict) -> None:
     Arguments:
         env: Mkdocs macro plugin environment dictionary.
     """
-    git_repo = git.Repo(search_parent_directories=True)
+    git_repo = GIT_CONTEXT.repo(env.project_dir, search_parent_directories=True)
     repo_slug = get_repo_slug(env, git_repo)
 
     set_site_name(env, repo_slug)
@@ -580,319 +595,203 @@ def set_config(env: dict) -> None:
         ):
             env.conf["plugins"].pop("monorepo")
         else:
-            update_nav(env, env.variables["subrepo"], first_iteration=True)
-
+            timed_call(
+                "update_nav",
+                update_nav,
+                env,
+                env.variables["subrepo"],
+                first_iteration=True,
+            )
 
-def load_yaml_file(path: str, filename: str) -> None:
-    """Ensure a YAML file is valid again a schema and return its content.
 
-    Depending on the name of the YAML file, compare its content to a schema to
-    validate its content. If content is not valid, an error will be raised.
-    Otherwise, its content will be returned.
+def update_setup_commands(env: dict) -> None:
+    """Add `src_path` of repos and subrepo to mkdocstrings `setup_commands`.
 
-    If filename is `extra.yml` or `extra.yaml`, load content of the file
-    unconditionnally.
+    The command left by a previous pass, ending with
+    [SRC_PATHS_MARKER][plugins.SRC_PATHS_MARKER], is removed, then a single
+    command adding every path of [SRC_PATHS][plugins_subrepo.SRC_PATHS], in
+    order and without duplicates, is appended, such that `setup_commands` does
+    not grow across passes. Other commands, e.g. set in `mkdocs.yml`, are kept.
 
     Arguments:
-        path: Base path where YAML files are.
-        filename: Name of the YAML file to load.
-    """
-    source_file = os.path.join(path, filename)
-    schema_file = os.path.join(path, "schema")
-    data_type = ""
-
-    if filename not in ("extra.yaml", "extra.yml"):
-        if filename in ("subrepo.yaml", "subrepo.yml"):
-            schema_file = os.path.join(schema_file, "subrepo.schema.yaml")
-        elif filename in ("vars.yaml", "vars.yml"):
-            schema_file = os.path.join(schema_file, "vars.schema.yaml")
-        elif filename not in ("extra.yaml", "extra.yml"):
-            schema_file = os.path.join(schema_file, "repo.schema.yaml")
-            data_type = "repo"
-        schema = yamlschema(source_file=source_file, schema_files=[schema_file])
-        schema.validate(raise_exception=True)
-        data_content = schema.source
-    else:
-        with open(source_file, encoding="UTF-8") as file:
-            data_content = yaml.safe_load(file)
-
-    return data_content, data_type
-
-
-# pylint: disable=R0913
-# - R0913: Too many arguments
-def update_subrepo_logo_src(
-    env: dict,
-    curr_repo: dict,
-    repo_name: str,
-    subrepo_dict: dict,
-    path: str,
-    external: bool,
-) -> None:
-    """Update the content of the key `logo` and `src_path` of subrepo.
-
-    Update value of keys `logo` and `src_path` of cloned subrepo, i.e. value
-    from file `docs/_data/repo.yaml` in the cloned subrepo, relative to the main
-    repo holding the documentation.
-
-    Args:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        curr_repo : Repo dictionary from `repo.yml` file in `docs/_data/` in the
-            cloned subrepo,
-        repo_name: Name of the repo,
-        subrepo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
-            in `docs/_data`,
-        path: Absolute path of the location of the cloned subrepo,
-        external: Boolean to know if current repo is an external subrepo.
+        env: Mkdocs macro plugin environment dictionary.
     """
-    logo_subpath = ""
-    src_subpath = ""
-    if external:
-        logo_subpath = os.path.join(subrepo_dict["online_url"])
-
-    src_subpath = os.path.join(
-        path.replace(f"{env.project_dir}/", ""), repo_name
-    )
-
-    if "logo" not in curr_repo:
-        curr_repo["logo"] = os.path.join(
-            logo_subpath, "assets", "img", "meta", f"{repo_name}_logo.png"
+    setup_commands = get_setup_commands(env)
+    if setup_commands is None:
+        return
+    setup_commands[:] = [
+        i_command
+        for i_command in setup_commands
+        if not i_command.endswith(SRC_PATHS_MARKER)
+    ]
+    if SRC_PATHS:
+        setup_commands.append(
+            f"sys.path.extend(i_path for i_path in {list(SRC_PATHS)!r} "
+            f"if i_path not in sys.path)  {SRC_PATHS_MARKER}"
         )
-    if "src_path" in curr_repo:
-        for i_src in curr_repo["src_path"]:
-            i_src = os.path.join(src_subpath, i_src)
-            env.conf["plugins"]["mkdocstrings"].config.data["handlers"][
-                "python"
-            ]["setup_commands"].append(f"sys.path.append('{i_src}')")
 
 
-def update_subrepo_info(
-    env: dict, subrepo_list: dict, path: str, external: bool = False
-) -> dict:
-    """Clone subrepo, load repo information and update values if needed.
+def load_var_file(env: dict) -> None:
+    """Load variables files in `docs/_data/`.
 
-    Recursively clone or pull repo defined from subpart of
-    `env.variables['subrepo'], load repo information from this cloned or pulled
-    repo, i.e. load file `docs/_data/repo.yaml` in the subrepo, and update
-    needed keys.
+    Load every yaml files in `docs/_data/`, if one of the file define the
+    current repo, then update keys `logo` and `src_path` for the current repo.
 
-    Args:
+    Arguments:
         env : Environment dictionary provided by
             [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        subrepo_list: List of dictionary storing subrepo dict,
-        path: Absolute path of the location of the cloned subrepo,
-        external: Boolean to know if current repo is an external subrepo.
-
-    Return:
-        A updating dictionary storing subrepo information
     """
-    return_dict = {}
-    for i_repo in subrepo_list:
-        subrepo_root = os.path.join(path, i_repo["name"])
-
-        if os.path.isdir(subrepo_root):
-            print(
-                f"{INFO_CLR}INFO [macros] - Pulling repo {i_repo['name']}{RESET_CLR}"
-            )
-            git_subrepo = git.Repo(subrepo_root)
-            git_subrepo.remotes.origin.pull("master")
-        else:
-            print(
-                f"{INFO_CLR}INFO [macros] - Cloning repo {i_repo['name']}{RESET_CLR}"
-            )
-            git.Repo.clone_from(i_repo["git_url"], subrepo_root)
-
-        if "subpath" in i_repo:
-            data_dir = os.path.join(
-                subrepo_root, i_repo["subpath"], "docs", "_data"
-            )
-        else:
-            data_dir = os.path.join(subrepo_root, "docs", "_data")
-
-        data_file = os.path.join(data_dir, f"{i_repo['name']}.yaml")
-        data, _ = load_yaml_file(data_dir, data_file)
-        for i_repo_info in data:
-            curr_repo = data[i_repo_info]
-            update_subrepo_logo_src(
-                env, curr_repo, i_repo_info, i_repo, path, external
-            )
-        return_dict.update(data)
-    return return_dict
-
-
-def update_subrepo(
-    env: dict, subrepo_dict: dict, path: str, external: bool
-) -> dict:
-    """Recursively parse `env.variables['subrepo']`.
-
-    Recursively parse dictionary `env.variables['subrepo']`, from file
-    `docs/_data/subrepo.yaml`. Depending on the key:
-
-    - `nav_entry`: Do a recursion of this method,
-    - `external` or `internal`: Parse the list to update subrepo information
-
-    Args:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        subrepo_dict: Dictionary storing subrepo,
-        path: Absolute path of the location of the cloned subrepo,
-        external: Boolean to know if current repo is an external subrepo.
+    var_dir = os.path.join(env.project_dir, "docs", "_data")
+    schema_dir = os.path.join(var_dir, "schema")
+    var_files = [
+        i_file
+        for i_file in os.listdir(var_dir)
+        if i_file.endswith((".yml", ".yaml"))
+    ]
+
+    def get_inputs():
+        return get_files_fingerprint(
+            [os.path.join(var_dir, i_file) for i_file in var_files]
+            + [os.path.join(schema_dir, i_file) for i_file in SCHEMA_FILES]
+        )
 
-    Returns:
-        An updated dictionary of repo informations.
-    """
-    return_dict = {}
-    for i_key in subrepo_dict:
-        if isinstance(subrepo_dict[i_key], list):
-            if i_key == "external":
-                external = True
-            elif i_key == "internal":
-                env.variables["internal_subdoc"] = True
-            return_dict.update(
-                update_subrepo_info(env, subrepo_dict[i_key], path, external)
-            )
-        elif i_key not in ["nav_entry"]:
-            return_dict.update(
-                update_subrepo(
-                    env,
-                    subrepo_dict[i_key],
-                    os.path.join(path, i_key),
-                    external,
-                )
-            )
-    return return_dict
+    def load_all():
+        return [
+            (i_file,) + load_yaml_file(var_dir, i_file) for i_file in var_files
+        ]
 
+    for _, data, data_type in run_phase(
+        f"data {var_dir}", get_inputs, load_all
+    ):
+        for i_key in data:
+            if data_type == "repo":
+                update_logo_src_repo(env, data[i_key], i_key)
+            env.variables[i_key] = data[i_key]
 
-def update_logo_src_repo(
-    env: dict, curr_repo: dict, repo_name: str, path: str = None
-) -> None:
-    """Update the content of the key `logo` and `src_path` of current repo.
 
-    Update value of keys `logo` and `src_path` of current repo holding the
-    documentation.
+def report_build_stats(env: dict) -> None:
+    """Print statistics of data files cache, subrepo fetch and phases.
 
-    Args:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-        curr_repo : Repo dictionary from `repo.yml` file in `docs/_data/` in the
-            cloned subrepo,
-        repo_name: Name of the repo,
-        path: Absolute path of the location of the current repo.
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary.
     """
-    subpath = ""
-    if path:
-        subpath = os.path.join(path.replace(env.project_dir, ""), repo_name)
-
-    if "logo" not in curr_repo:
-        curr_repo["logo"] = os.path.join(
-            subpath, "assets", "img", "meta", f"{repo_name}_logo.png"
+    print(
+        f"{INFO_CLR}INFO [macros] - Data files cache: "
+        f"{DATA_CACHE_STATS['hit']} hit, {DATA_CACHE_STATS['miss']} miss"
+        f"{RESET_CLR}"
+    )
+    if SUBREPO_FETCH_STATUS:
+        fetch_status = collections.Counter(SUBREPO_FETCH_STATUS.values())
+        print(
+            f"{INFO_CLR}INFO [macros] - Subrepo: {fetch_status['fetched']} "
+            f"fetched, {fetch_status['kept']} kept, {fetch_status['stale']} "
+            f"stale{RESET_CLR}"
+        )
+    if "stale" in SUBREPO_FETCH_STATUS.values():
+        LOG.warning(
+            "%s[macros] - Subrepo not up to date, fetching them failed: %s%s",
+            ERR_CLR,
+            ", ".join(
+                os.path.relpath(i_root, env.project_dir)
+                for i_root, i_status in SUBREPO_FETCH_STATUS.items()
+                if i_status == "stale"
+            ),
+            RESET_CLR,
+        )
+    if PIPELINE_STATS["validated"]:
+        print(
+            f"{INFO_CLR}INFO [macros] - Subrepo pipeline: "
+            f"{PIPELINE_STATS['validated']} validated while fetching, "
+            f"max queue depth {PIPELINE_STATS['max_queue']}, "
+            f"fetch {PIPELINE_STATS['fetch'] * 1000:.1f} ms, "
+            f"queue wait {PIPELINE_STATS['queue_wait'] * 1000:.1f} ms, "
+            f"validation {PIPELINE_STATS['validate'] * 1000:.1f} ms, "
+            f"merge wait {PIPELINE_STATS['merge_wait'] * 1000:.1f} ms"
+            f"{RESET_CLR}"
+        )
+    if PHASE_STATS["reused"]:
+        print(
+            f"{INFO_CLR}INFO [macros] - Incremental build: "
+            f"{PHASE_STATS['reused']} phases reused, {PHASE_STATS['run']} run"
+            f"{RESET_CLR}"
         )
-    if "src_path" in curr_repo:
-        for i_src in curr_repo["src_path"]:
-            i_src = os.path.join(subpath, i_src)
-            env.conf["plugins"]["mkdocstrings"].config.data["handlers"][
-                "python"
-            ]["setup_commands"].append(f"sys.path.append('{i_src}')")
 
 
-def load_var_file(env: dict) -> None:
-    """Load variables files in `docs/_data/`.
+def update_config(env: dict, parent_build: dict) -> None:
+    """Update variables and configuration of mkdocs, as a build or a part of it.
 
-    Load every yaml files in `docs/_data/`, if one of the file define the
-    current repo, then update keys `logo` and `src_path` for the current repo.
+    Subrepo are fetched, as their commits are inputs of the snapshot, then the
+    configuration is taken from its snapshot if any, see
+    [get_build_fingerprint][plugins_snapshot.get_build_fingerprint], else
+    computed and snapshotted.
 
     Arguments:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        env: Mkdocs macro plugin environment dictionary,
+        parent_build: Build the config is part of, see
+            [get_parent_build][plugins_state.get_parent_build].
     """
-    var_dir = os.path.join(env.project_dir, "docs", "_data")
-
-    for i_file in os.listdir(var_dir):
-        if i_file.endswith((".yml", ".yaml")):
-            data, data_type = load_yaml_file(var_dir, i_file)
-            for i_key in data:
-                if data_type == "repo":
-                    update_logo_src_repo(env, data[i_key], i_key)
-                env.variables[i_key] = data[i_key]
-
-
-def update_version(env: dict) -> None:
-    """Parse every tags of the repo to build a `docs/versions.json`.
-
-    To emulate mike version support for gitlab, this method will parse every
-    tags of the current repo holding the current documentation to create a file
-    `versions.json` which will be put in folder `docs`.
+    variables = copy_variables(env)
+    timed_call("load_var_file", load_var_file, env)
 
-    This is mainly used for the CI to build a documentation per repo tags.
+    nested_subrepo = []
+    if "subrepo" in env.variables:
+        nested_subrepo = run_phase(
+            f"fetch {env.project_dir}",
+            functools.partial(get_fetch_inputs, env),
+            functools.partial(
+                timed_call,
+                "fetch_all_subrepo",
+                fetch_all_subrepo,
+                env,
+                env.variables["subrepo"],
+                env.project_dir,
+            ),
+        )
 
-    Arguments:
-        env : Environment dictionary provided by
-            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
-    """
-    if (
-        "version" not in env.variables
-        or "provider" not in env.variables["version"]
-        or env.variables["version"]["provider"] != "mike"
-    ):
-        return
-    git_repo = git.Repo(search_parent_directories=True)
-    mike_version = []
-    last_major = -1
-    last_minor = -1
-    last_patch = str(-1)
-    for i_tag in git_repo.tags:
-        i_tag = yaml.dump(i_tag.path)
-        i_tag = re.sub(".*v", "", i_tag).split(".")
-        major = int(i_tag[0])
-        minor = int(i_tag[1])
-        patch = str()
-        for i_remain_tag in i_tag[2:]:
-            if i_remain_tag and i_remain_tag not in ("", "\n"):
-                i_remain_tag = i_remain_tag.replace("\n", "")
-                if not patch:
-                    patch = f"{i_remain_tag}"
-                else:
-                    patch = f"{patch}.{i_remain_tag}"
-        if major > last_major:
-            if last_major >= 0:
-                mike_version.append(
-                    {
-                        "version": f"{last_major}.{last_minor}",
-                        "title": f"{last_major}.{last_minor}.{last_patch}",
-                        "aliases": [],
-                    }
-                )
-            last_major = major
-            last_minor = -1
-        if minor > last_minor:
-            if last_minor >= 0:
-                mike_version.append(
-                    {
-                        "version": f"{last_major}.{last_minor}",
-                        "title": f"{last_major}.{last_minor}.{last_patch}",
-                        "aliases": [],
-                    }
-                )
-            last_minor = minor
-            last_patch = str(-1)
-        if patch > last_patch:
-            last_patch = str(patch)
-
-    mike_version.append(
-        {
-            "version": f"{last_major}.{last_minor}",
-            "title": f"{last_major}.{last_minor}.{last_patch}",
-            "aliases": ["latest"],
-        }
+    fingerprint = timed_call(
+        "get_build_fingerprint", get_build_fingerprint, env, nested_subrepo
+    )
+    snapshot_file = os.path.join(
+        os.path.expanduser(CACHE_DIR),
+        "snapshots",
+        f"{fingerprint}.json",
     )
-    mike_version.reverse()
-    with open(
-        os.path.join(env.project_dir, "docs", "versions.json"),
-        "w",
-        encoding="UTF-8",
-    ) as version_file:
-        json.dump(mike_version, version_file, indent=2)
+    snapshot = load_snapshot(snapshot_file)
+    if snapshot:
+        print(
+            f"{INFO_CLR}INFO [macros] - Using configuration snapshot "
+            f"{snapshot_file}{RESET_CLR}"
+        )
+        apply_snapshot(env, snapshot)
+    else:
+        if "subrepo" in env.variables:
+            env.variables["internal_subdoc"] = False
+            env.variables.update(
+                timed_call(
+                    "update_subrepo",
+                    update_subrepo,
+                    env,
+                    env.variables["subrepo"],
+                    env.project_dir,
+                    False,
+                )
+            )
+            for i_name, i_info in timed_call(
+                "update_nested_subrepo",
+                update_nested_subrepo,
+                env,
+                nested_subrepo,
+            ).items():
+                env.variables.setdefault(i_name, i_info)
+        timed_call("set_config", set_config, env)
+        update_setup_commands(env)
+        save_snapshot(snapshot_file, take_snapshot(env, variables))
+
+    # Versions of subrepo are not used by the site including them, which
+    # refreshes every subrepo
+    if not parent_build:
+        timed_call("update_version", update_version, env)
+        update_refresher(env, nested_subrepo)
 
 
 def define_env(env: dict) -> None:
@@ -914,19 +813,44 @@ def define_env(env: dict) -> None:
     Arguments:
         env: Mkdocs macro plugin environment dictionary.
     """
-    load_var_file(env)
-
-    if "subrepo" in env.variables:
-        env.variables["internal_subdoc"] = False
-        env.variables.update(
-            update_subrepo(
-                env, env.variables["subrepo"], env.project_dir, False
-            )
+    start_trace()
+    start = time.perf_counter()
+    DATA_CACHE_STATS.update({"hit": 0, "miss": 0})
+    PHASE_STATS.update({"reused": 0, "run": 0})
+    SRC_PATHS.clear()
+    TIMINGS.clear()
+    SUBREPO_PIPELINE.clear()
+    SUBREPO_FETCH_STATUS.clear()
+    PIPELINE_STATS.update(
+        {i_key: type(i_value)() for i_key, i_value in PIPELINE_STATS.items()}
+    )
+    parent_build = get_parent_build(env)
+    if parent_build:
+        print(
+            f"{INFO_CLR}INFO [macros] - Monorepo config of "
+            f"{os.path.relpath(env.project_dir, parent_build['root'])}, "
+            f"reusing the build of {parent_build['root']}{RESET_CLR}"
         )
-
-    set_config(env)
-
-    update_version(env)
+    else:
+        start_build(env)
+    try:
+        update_config(env, parent_build)
+    except BaseException:
+        # The failed build does not reach on_post_build
+        end_build()
+        raise
+
+    report_build_stats(env)
+    if env.variables.get("to_html", {}).get("markdown_extensions"):
+        convert = get_markdown_converter(
+            env.conf["markdown_extensions"], env.conf["mdx_configs"]
+        )
+    else:
+        convert = get_markdown_converter()
+    record_timing("define_env", time.perf_counter() - start)
+    record_span("define_env", "phase", start, {})
+    report_timings(env)
+    write_trace(env)
 
     @env.macro
     # pylint: disable=W0612
@@ -950,13 +874,36 @@ def define_env(env: dict) -> None:
     def to_html(var: str) -> dict:
         """Convert the content of the markdown string into HTML.
 
+        See [get_markdown_converter][plugins.get_markdown_converter]. If key
+        `markdown_extensions` of `to_html` in `docs/_data/vars.yml` is true,
+        the `markdown_extensions` of the site are used.
+
         Arguments:
             var: Markdown string which need to be converted to HTML
 
         Returns:
             The content of the markdown converted to HTML
         """
-        return markdown.markdown(var)
+        return convert(var)
+
+
+def on_post_build(env: dict) -> None:
+    """Hook run by mkdocs-macros-plugin once the site is built.
+
+    Write `versions.json` in `site_dir` when asked to, see
+    [get_versions_output][plugins_versions.get_versions_output]. It can not be
+    written by [define_env][plugins.define_env] as mkdocs cleans `site_dir`
+    after.
+
+    End the build, see [get_parent_build][plugins_state.get_parent_build], and
+    close git repos, kept open for the configs of monorepo subrepo until then.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary.
+    """
+    if get_versions_output(env) == "site_dir":
+        write_versions_file(env.conf["site_dir"])
+    end_build()
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,196 @@
+"""Keep git repos open across builds.
+
+Module of [plugins.py][plugins], see [GitContext][plugins_git.GitContext].
+"""
+
+# pylint: disable=R0801,C0415
+# - C0415: Import outside toplevel, heavy dependencies are imported on first
+#   use, see `typing.TYPE_CHECKING` below
+
+# Annotations naming lazily imported modules are not evaluated
+from __future__ import annotations
+
+# Ordered dictionary of open git repos
+# https://docs.python.org/3/library/collections.html
+import collections
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# High-level file operations
+# https://docs.python.org/3/library/shutil.html
+import shutil
+
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
+# Names of lazily imported modules used in type hints
+# https://docs.python.org/3/library/typing.html
+import typing
+
+# Dropped git repos not garbage collected yet
+# https://docs.python.org/3/library/weakref.html
+import weakref
+
+# Following dependencies are slow to import and not always needed. They are
+# imported by methods using them, on first use, and only for type hints here.
+if typing.TYPE_CHECKING:
+    # Python Git Library
+    # https://pypi.org/project/GitPython/
+    import git
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+GIT_MAX_REPOS = 16
+"""Maximum number of git repos kept open, with their git processes."""
+
+
+class GitContext:
+    """Shared access to git repos used during a build.
+
+    Hand out a single `git.Repo` per repo, such that persistent `git cat-file`
+    processes started by GitPython are reused instead of started again for
+    every new `git.Repo`. At most `max_repos` repos are kept, the least
+    recently used one is dropped when another repo is opened. It is not
+    closed, as a fetch worker or the validation worker may still use it: its
+    processes are stopped once it is garbage collected, or when the context is
+    closed at the end of the build. A closed `git.Repo` stays usable,
+    GitPython starts its processes again if needed.
+
+    Attributes:
+        max_repos: Maximum number of repos kept open,
+        repos: Ordered dictionary which keys are absolute path of working
+            trees or bare repos and values are their `git.Repo`, from the least
+            to the most recently used,
+        dropped: Weak set of repos dropped from `repos`, not garbage collected
+            yet,
+        lock: Lock protecting `repos`, as subrepo are fetched concurrently.
+    """
+
+    def __init__(self, max_repos: int = GIT_MAX_REPOS) -> None:
+        """Initialize a context without any open repo.
+
+        Arguments:
+            max_repos: Maximum number of repos kept open.
+        """
+        self.max_repos = max_repos
+        self.repos = collections.OrderedDict()
+        self.dropped = weakref.WeakSet()
+        self.lock = threading.Lock()
+
+    def _register(self, path: str, git_repo: git.Repo) -> git.Repo:
+        """Keep a repo open, dropping the least recently used one if needed.
+
+        Arguments:
+            path: Absolute path of the repo,
+            git_repo: Git python object of the repo.
+
+        Returns:
+            The git python object of the repo.
+        """
+        with self.lock:
+            self.repos[path] = git_repo
+            self.repos.move_to_end(path)
+            while len(self.repos) > self.max_repos:
+                # Closed by GitPython once no thread uses it anymore
+                self.dropped.add(self.repos.popitem(last=False)[1])
+        return git_repo
+
+    def repo(
+        self, path: str = None, search_parent_directories: bool = None
+    ) -> git.Repo:
+        """Return the git python object of a repo, opening it if needed.
+
+        Arguments:
+            path: Absolute path of the repo, if not set, the repo holding the
+                current working directory,
+            search_parent_directories: If true, `path` can be a folder inside
+                the repo, default to true only if `path` is not set.
+
+        Returns:
+            The git python object of the repo.
+        """
+        import git
+
+        if search_parent_directories is None:
+            search_parent_directories = path is None
+        path = os.path.abspath(path or os.getcwd())
+        with self.lock:
+            if path in self.repos:
+                self.repos.move_to_end(path)
+                return self.repos[path]
+        return self._register(
+            path,
+            git.Repo(path, search_parent_directories=search_parent_directories),
+        )
+
+    def clone(
+        self, git_url: str, path: str, timeout: float = None, **kwargs
+    ) -> git.Repo:
+        """Clone a repo and keep it open.
+
+        If cloning fails, the partial clone is removed.
+
+        Arguments:
+            git_url: URL or path of the repo to clone,
+            path: Absolute path of the clone,
+            timeout: Number of seconds after which `git clone` is killed, if
+                any,
+            kwargs: Options of `git clone`, see `git.Repo.clone_from`.
+
+        Returns:
+            The git python object of the clone.
+        """
+        import git
+
+        try:
+            if timeout:
+                # Process started by `git.Repo.clone_from` can not be killed
+                git.Git().clone(
+                    "--", git_url, path, kill_after_timeout=timeout, **kwargs
+                )
+                git_repo = git.Repo(path)
+            else:
+                git_repo = git.Repo.clone_from(git_url, path, **kwargs)
+        except git.GitCommandError:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        return self._register(os.path.abspath(path), git_repo)
+
+    def close(self) -> None:
+        """Close every open or dropped repo, stopping their git processes."""
+        with self.lock:
+            while self.repos:
+                _, git_repo = self.repos.popitem()
+                git_repo.close()
+            for i_repo in list(self.dropped):
+                i_repo.close()
+            self.dropped.clear()
+
+
+def has_commit(git_repo: git.Repo, commit: str) -> bool:
+    """Check if a commit is available in a local git repo.
+
+    The persistent `git cat-file` process of the repo is used, see
+    [GitContext][plugins_git.GitContext], rather than a new git process.
+
+    Args:
+        git_repo: Git python object of the repo,
+        commit: SHA of the commit.
+
+    Returns:
+        True if the commit object is in the repo, False otherwise.
+    """
+    try:
+        return git_repo.odb.info(bytes.fromhex(commit)).type == b"commit"
+    except ValueError:
+        # Invalid SHA, or object missing from the repo
+        return False
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
@@ -0,0 +1,287 @@
+"""Update the `nav` key of the mkdocs configuration with subrepo.
+
+Module of [plugins.py][plugins], see [update_nav][plugins_nav.update_nav].
+"""
+
+# pylint: disable=R0801
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import traced
+
+
+class NavIndex:
+    """Index of the entries of the `nav` key of `env.conf`.
+
+    Map the path of titles of every entry of `nav` holding a list of entries
+    to this list, such that finding where to add a subrepo does not require to
+    walk or dump the whole `nav`. The index is updated when entries are added
+    with [NavIndex.add_entry][plugins_nav.NavIndex.add_entry].
+
+    Attributes:
+        nav: The `nav` key of `env.conf`,
+        nodes: Dictionary which keys are tuple of titles and values are the list
+            of entries under this path of titles,
+        paths: Dictionary which keys are titles and values are list of path of
+            titles ending with this title.
+    """
+
+    def __init__(self, nav: list) -> None:
+        """Build the index of `nav`.
+
+        Arguments:
+            nav: The `nav` key of `env.conf`.
+        """
+        self.nav = nav
+        self.nodes = {(): nav}
+        self.paths = {}
+        self._index(nav, ())
+
+    def _index(self, nav: list, parent: tuple) -> None:
+        """Recursively add list of entries of `nav` to the index.
+
+        Arguments:
+            nav: List of entries (subpart of `nav` if called recursively),
+            parent: Path of titles of `nav`.
+        """
+        for i_nav in nav:
+            if not isinstance(i_nav, dict):
+                continue
+            for i_key, i_value in i_nav.items():
+                if isinstance(i_value, list):
+                    self._add_node(parent + (i_key,), i_value)
+                    self._index(i_value, parent + (i_key,))
+
+    def _add_node(self, path: tuple, node: list) -> None:
+        """Add a list of entries to the index.
+
+        If `path` is already indexed, i.e. the same path of titles appears
+        twice in `nav`, the first one is kept.
+
+        Arguments:
+            path: Path of titles of the list of entries,
+            node: List of entries.
+        """
+        if path not in self.nodes:
+            self.nodes[path] = node
+            self.paths.setdefault(path[-1], []).append(path)
+
+    def find(self, nav_parent: list) -> list:
+        """Return lists of entries matching a list of `nav_entry`.
+
+        If `nav_parent` is a path of titles from the root of `nav`, return the
+        list of entries under this path. Otherwise, return every list of
+        entries which path of titles ends with `nav_parent[-1]` and holds every
+        title of `nav_parent` in the same order, i.e. parents `nav_entry` can
+        be nested deeper in `nav`.
+
+        Arguments:
+            nav_parent: List of keys storing parents `nav_entry` keys.
+
+        Returns:
+            The list of matching list of entries, empty if none match.
+        """
+        nav_parent = tuple(nav_parent or ())
+        if nav_parent in self.nodes:
+            return [self.nodes[nav_parent]]
+
+        matches = []
+        for i_path in self.paths.get(nav_parent[-1], []):
+            titles = iter(i_path)
+            if all(i_title in titles for i_title in nav_parent):
+                matches.append(self.nodes[i_path])
+        return matches
+
+    def add_entry(self, nav_parent: list) -> list:
+        """Create missing entries from the root of `nav` to `nav_parent`.
+
+        Arguments:
+            nav_parent: List of keys storing parents `nav_entry` keys.
+
+        Returns:
+            The list of entries under the path of titles `nav_parent`.
+        """
+        node = self.nav
+        for i_depth in range(1, len(nav_parent) + 1):
+            path = tuple(nav_parent[:i_depth])
+            if path not in self.nodes:
+                entry = {path[-1]: []}
+                node.append(entry)
+                self._add_node(path, entry[path[-1]])
+            node = self.nodes[path]
+        return node
+
+
+def add_internal_to_nav(
+    env: dict,
+    nav_index: NavIndex,
+    repo_dict: dict,
+    repo_parent: list,
+    nav_parent: list = None,
+) -> None:
+    """Add internal subrepo to `nav` key of mkdocs.yml for monorepo.
+
+    This method look for `nav_parent` in `nav_index` to know where to include
+    the internal subrepo into `nav` key.
+
+    Once determined, add the subrepo as a entry to the `nav` key, with the
+    format required by
+    [mkdocs-monorepo-plugin](https://github.com/backstage/mkdocs-monorepo-plugin).
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        nav_index : Index of the `nav` key of `env.conf`
+        repo_dict : Repo dictionary from `subrepo.yml` file in `docs/_data/`
+        repo_parent : List of keys storing parent keys of the current
+            `repo_dict` from `subrepo.yml` file in `docs/_data`
+        nav_parent : List of keys storing parents `nav_entry` keys of the
+            current `repo_dict` from `subrepo.yml` file in `docs/_data`
+    """
+    mkdocs_path = env.project_dir
+    for i_parent in repo_parent:
+        mkdocs_path = os.path.join(mkdocs_path, i_parent)
+    mkdocs_path = os.path.join(mkdocs_path, repo_dict["name"])
+    if "subpath" in repo_dict:
+        mkdocs_path = os.path.join(mkdocs_path, repo_dict["subpath"])
+    mkdocs_path = os.path.join(mkdocs_path, "mkdocs.yml")
+    for i_nav in nav_index.find(nav_parent):
+        i_nav.append({repo_dict["nav_entry"]: f"!include {mkdocs_path}"})
+
+
+def add_external_to_nav(
+    env: dict,
+    nav_index: NavIndex,
+    repo_dict: dict,
+    repo_parent: list,
+    nav_parent: list,
+) -> None:
+    """Add external subrepo to `nav` key of mkdocs.yml.
+
+    This method look for `nav_parent` in `nav_index` to know where to include
+    the external subrepo into `nav` key.
+
+    Once determined, add the subrepo as a entry to the `nav` key, with the
+    `online_url` key of the current subrepo defined with `repo_dict` in file
+    `subrepo.yml` in `docs/_data`.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        nav_index : Index of the `nav` key of `env.conf`
+        repo_dict : Repo dictionary from `subrepo.yml` file in `docs/_data/`
+        repo_parent : List of keys storing parent keys of the current
+            `repo_dict` from `subrepo.yml` file in `docs/_data`
+        nav_parent : List of keys storing parents `nav_entry` keys of the
+            current `repo_dict` from `subrepo.yml` file in `docs/_data`
+    """
+    # pylint: disable=W0613
+    # - W0613: Unused argument, kept to share signature with internal subrepo
+    if repo_dict["online_url"].startswith("/"):
+        entry = {
+            repo_dict["nav_entry"]: repo_dict["online_url"].replace(
+                "/", "../", 1
+            )
+        }
+    else:
+        entry = {repo_dict["nav_entry"]: repo_dict["online_url"]}
+    for i_nav in nav_index.find(nav_parent):
+        i_nav.append(entry.copy())
+
+
+def add_nav_entry(nav_index: NavIndex, nav_parent: list = None) -> None:
+    """Create missing entry into `nav` key of `env.conf`.
+
+    If no entry of key `nav` of mkdocs.yml matches `nav_parent`, create
+    missing entries from the root of `nav`.
+
+    Args:
+        nav_index : Index of the `nav` key of `env.conf`
+        nav_parent : List of keys storing parents `nav_entry` keys
+    """
+    if not nav_index.find(nav_parent):
+        nav_index.add_entry(nav_parent)
+
+
+# pylint: disable=R0913
+# - R0913: Too many arguments
+def update_nav(
+    env: dict,
+    repo_dict: dict,
+    repo_parent: list = None,
+    nav_parent: list = None,
+    first_iteration=False,
+    nav_index: NavIndex = None,
+) -> None:
+    """Meta method which dynamically update the `nav` key of `env.conf`.
+
+    Recursively parse `repo_dict` (provided from `subrepo.yml` file in
+    `docs/_data`), depending on the content of the keys, method will:
+
+    - Update the list of `nav_parent` and `repo_parent`,
+    - Call [add_nav_entry][plugins_nav.add_nav_entry] to add missing entry to
+      `nav` key of `mkdocs.yml`,
+    - Call [add_external_to_nav][plugins_nav.add_external_to_nav] to add
+      external subrepo to `nav` key of `mkdocs.yml`,
+    - Call [add_internal_to_nav][plugins_nav.add_internal_to_nav] to add
+      internal subrepo to `nav` key of `mkdocs.yml`,
+    - Recursively call itself.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        repo_dict : Repo dictionary from `subrepo.yml` file in `docs/_data/`
+        repo_parent : List of keys storing parent keys of the current
+            `repo_dict` from `subrepo.yml` file in `docs/_data`
+        nav_parent : List of keys storing parents `nav_entry` keys of the
+            current `repo_dict` from `subrepo.yml` file in `docs/_data`
+        first_iteration : Simple boolean to know if it is the first recursive
+            call of the method.
+        nav_index : Index of the `nav` key of `env.conf`, built from
+            `env.conf["nav"]` if not provided.
+    """
+    if nav_index is None:
+        nav_index = NavIndex(env.conf["nav"])
+
+    for i_key in repo_dict:
+        if not nav_parent or first_iteration:
+            nav_parent = []
+
+        if not repo_parent or first_iteration:
+            repo_parent = []
+
+        if i_key == "nav_entry":
+            nav_parent.append(repo_dict["nav_entry"])
+        elif i_key == "internal":
+            for i_repo in repo_dict["internal"]:
+                with traced("add_internal_to_nav", repo=i_repo["name"]):
+                    add_nav_entry(nav_index, nav_parent)
+                    add_internal_to_nav(
+                        env, nav_index, i_repo, repo_parent, nav_parent
+                    )
+        elif i_key == "external":
+            for i_repo in repo_dict["external"]:
+                with traced("add_external_to_nav", repo=i_repo["name"]):
+                    add_nav_entry(nav_index, nav_parent)
+                    add_external_to_nav(
+                        env, nav_index, i_repo, repo_parent, nav_parent
+                    )
+        else:
+            repo_parent.append(i_key)
+            update_nav(
+                env,
+                repo_dict[i_key],
+                repo_parent,
+                nav_parent,
+                nav_index=nav_index,
+            )
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
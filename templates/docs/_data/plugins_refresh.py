@@ -0,0 +1,421 @@
+"""Refresh subrepo in the background during `mkdocs serve`.
+
+Module of [plugins.py][plugins], see
+[update_refresher][plugins_refresh.update_refresher].
+"""
+
+# pylint: disable=R0801,C0415
+# - C0415: Import outside toplevel, heavy dependencies are imported on first
+#   use
+
+# Bind the trigger file to the method watching it
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# Secure hashes and message digests
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# System-specific parameters and functions
+# https://docs.python.org/3/library/sys.html
+import sys
+
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
+# Module holding the state kept across builds
+# https://docs.python.org/3/library/types.html
+import types
+
+# Subrepo cloned or pulled concurrently
+# docs/_data/plugins_fetch.py
+from plugins_fetch import (
+    SUBREPO_LOCK_FILE,
+    get_fetch_config,
+    load_subrepo_lock,
+    update_mirror,
+)
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import (
+    CACHE_DIR,
+    ERR_CLR,
+    INFO_CLR,
+    LOG,
+    RESET_CLR,
+    get_state_module,
+)
+
+# Data files of subrepo merged into the configuration
+# docs/_data/plugins_subrepo.py
+from plugins_subrepo import get_subrepo_config, list_subrepo
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+REFRESH_REF = "refs/refresh/master"
+"""Ref of subrepo in which the refresher fetches branch `master`."""
+
+
+class SubrepoRefresher:
+    """Background refresher of subrepo while `mkdocs serve` runs.
+
+    Every `interval` seconds, subrepo are fetched, see
+    [fetch_refresh_ref][plugins_refresh.fetch_refresh_ref], then
+    fast-forwarded if their remote moved, see
+    [fast_forward_subrepo][plugins_refresh.fast_forward_subrepo]. If at least
+    one subrepo changed, the trigger file is touched, such that `mkdocs serve`
+    rebuilds the documentation, see
+    [watch_refresh_trigger][plugins_refresh.watch_refresh_trigger]. Subrepo are
+    neither fetched nor fast-forwarded while a build is in progress, see
+    [get_parent_build][plugins_state.get_parent_build], but builds start while
+    subrepo are fetched: only the fast-forward and the touch of the trigger
+    file hold `build_lock` of the state module.
+
+    Attributes:
+        interval: Number of seconds between two refreshes,
+        state_module: Module storing the state shared across builds, see
+            [get_state_module][plugins_state.get_state_module],
+        targets: Dictionary with keys `subrepo`, list of tuples
+            `(repo_dict, subrepo_root)` of subrepo to refresh, `config`,
+            dictionary describing how subrepo are fetched, see
+            [fetch_subrepo][plugins_fetch.fetch_subrepo], and `trigger_file`,
+            absolute path of the file touched to rebuild the documentation,
+        lock: Lock protecting `targets`, updated by builds,
+        stopped: Event set to stop the refresher,
+        thread: Daemon thread refreshing subrepo.
+    """
+
+    def __init__(self, interval: float, state_module: types.ModuleType) -> None:
+        """Initialize a refresher without any subrepo.
+
+        Arguments:
+            interval: Number of seconds between two refreshes,
+            state_module: Module storing the state shared across builds.
+        """
+        self.interval = interval
+        self.state_module = state_module
+        self.targets = {"subrepo": [], "config": {}, "trigger_file": None}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name="subrepo-refresher", daemon=True
+        )
+
+    def update(self, subrepo: list, config: dict, trigger_file: str) -> None:
+        """Set subrepo refreshed from now on.
+
+        Arguments:
+            subrepo: List of tuples `(repo_dict, subrepo_root)` of subrepo,
+            config: Dictionary describing how subrepo are fetched,
+            trigger_file: Absolute path of the file touched to rebuild the
+                documentation.
+        """
+        with self.lock:
+            self.targets = {
+                "subrepo": subrepo,
+                "config": config,
+                "trigger_file": trigger_file,
+            }
+
+    def start(self) -> None:
+        """Start refreshing subrepo in the background."""
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing subrepo, once the current refresh is done."""
+        self.stopped.set()
+
+    def _fetch(self, subrepo: list, config: dict) -> list:
+        """Fetch subrepo once, without updating their working tree.
+
+        Arguments:
+            subrepo: List of tuples `(repo_dict, subrepo_root)` of subrepo,
+            config: Dictionary describing how subrepo are fetched.
+
+        Returns:
+            List of tuples `(repo_dict, subrepo_root)` of subrepo which remote
+            moved.
+        """
+        import git
+
+        moved = []
+        for i_repo, i_root in subrepo:
+            if self.stopped.is_set():
+                break
+            try:
+                if fetch_refresh_ref(i_repo, i_root, config):
+                    moved.append((i_repo, i_root))
+            except (git.GitCommandError, OSError) as error:
+                LOG.warning(
+                    "%s[macros] - Refreshing repo %s failed: %s%s",
+                    ERR_CLR,
+                    i_repo["name"],
+                    error,
+                    RESET_CLR,
+                )
+        return moved
+
+    def _fast_forward(self, moved: list, config: dict) -> list:
+        """Fast-forward fetched subrepo, while builds wait.
+
+        Arguments:
+            moved: List of tuples `(repo_dict, subrepo_root)` of subrepo which
+                remote moved,
+            config: Dictionary describing how subrepo are fetched.
+
+        Returns:
+            Names of subrepo which changed.
+        """
+        import git
+
+        changed = []
+        for i_repo, i_root in moved:
+            try:
+                if fast_forward_subrepo(i_repo, i_root, config):
+                    changed.append(i_repo["name"])
+            except (git.GitCommandError, OSError) as error:
+                LOG.warning(
+                    "%s[macros] - Refreshing repo %s failed: %s%s",
+                    ERR_CLR,
+                    i_repo["name"],
+                    error,
+                    RESET_CLR,
+                )
+        return changed
+
+    def _run(self) -> None:
+        """Refresh subrepo every `interval` seconds until stopped."""
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                targets = self.targets
+            # Fetches may last minutes, builds starting meanwhile do not wait
+            if self.state_module.build is not None:
+                continue
+            moved = self._fetch(targets["subrepo"], targets["config"])
+            if not moved:
+                continue
+            # A build starting while working trees are updated waits for it
+            with self.state_module.build_lock:
+                if self.stopped.is_set() or self.state_module.build is not None:
+                    continue
+                changed = self._fast_forward(moved, targets["config"])
+                if changed:
+                    print(
+                        f"{INFO_CLR}INFO [macros] - Subrepo refreshed in the "
+                        f"background: {', '.join(changed)}{RESET_CLR}"
+                    )
+                    os.utime(targets["trigger_file"])
+
+
+def fetch_refresh_ref(repo_dict: dict, subrepo_root: str, config: dict) -> bool:
+    """Fetch branch `master` of the remote of a subrepo in `REFRESH_REF`.
+
+    Branch `master` is fetched, from the mirror of the subrepo if
+    `config["mirror_dir"]` is set, in
+    [REFRESH_REF][plugins_refresh.REFRESH_REF] rather than `FETCH_HEAD`, which
+    a build may write meanwhile. The working tree is left as is, see
+    [fast_forward_subrepo][plugins_refresh.fast_forward_subrepo]. See
+    [fetch_subrepo][plugins_fetch.fetch_subrepo] for the description of
+    `config`.
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        config: Dictionary describing how subrepo are fetched.
+
+    Returns:
+        True if the fetched commit differs from `HEAD`.
+    """
+    import git
+
+    timeout = repo_dict.get("timeout", config["timeout"])
+    remote = "origin"
+    if config["mirror_dir"]:
+        remote = update_mirror(
+            repo_dict["git_url"], config["mirror_dir"], timeout
+        )
+    fetch_args = []
+    if config["checkout"] == "sparse" and not config["mirror_dir"]:
+        fetch_args = ["--depth=1", "--filter=blob:none"]
+
+    # Git processes are not kept, unlike those of repos of GIT_CONTEXT
+    git_cmd = git.Git(subrepo_root)
+    git_cmd.fetch(
+        *fetch_args,
+        remote,
+        f"+master:{REFRESH_REF}",
+        kill_after_timeout=timeout,
+    )
+    return git_cmd.rev_parse("HEAD") != git_cmd.rev_parse(REFRESH_REF)
+
+
+def fast_forward_subrepo(
+    repo_dict: dict, subrepo_root: str, config: dict
+) -> bool:
+    """Fast-forward a subrepo to the commit fetched in `REFRESH_REF`.
+
+    See [fetch_refresh_ref][plugins_refresh.fetch_refresh_ref]. Only local
+    git commands run, such that builds wait for them shortly. A subrepo with
+    local commits is reported and left as is.
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        config: Dictionary describing how subrepo are fetched.
+
+    Returns:
+        True if the working tree of the subrepo was updated.
+    """
+    import git
+
+    git_cmd = git.Git(subrepo_root)
+    if git_cmd.rev_parse("HEAD") == git_cmd.rev_parse(REFRESH_REF):
+        return False
+    if config["checkout"] == "sparse":
+        # A shallow history can not be merged, move to the fetched commit
+        # while keeping local changes.
+        git_cmd.reset("--keep", REFRESH_REF)
+    else:
+        try:
+            git_cmd.merge("--ff-only", REFRESH_REF)
+        except git.GitCommandError:
+            LOG.warning(
+                "%s[macros] - Repo %s can not be fast-forwarded, it is not "
+                "refreshed.%s",
+                ERR_CLR,
+                repo_dict["name"],
+                RESET_CLR,
+            )
+            return False
+    return True
+
+
+def is_serving() -> bool:
+    """Check if the documentation is built by `mkdocs serve`.
+
+    Returns:
+        True if the command run is `mkdocs serve`.
+    """
+    return "serve" in sys.argv[1:]
+
+
+def get_refresh_trigger_file(env: dict) -> str:
+    """Return the file touched to rebuild the documentation, creating it.
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+
+    Returns:
+        Absolute path of the file in `refresh` of
+        [CACHE_DIR][plugins_state.CACHE_DIR], named after the hash of the path
+        of the documentation.
+    """
+    trigger_file = os.path.join(
+        os.path.expanduser(CACHE_DIR),
+        "refresh",
+        hashlib.sha256(os.path.abspath(env.project_dir).encode()).hexdigest(),
+    )
+    if not os.path.isfile(trigger_file):
+        os.makedirs(os.path.dirname(trigger_file), exist_ok=True)
+        with open(trigger_file, "w", encoding="UTF-8"):
+            pass
+    return trigger_file
+
+
+def watch_refresh_trigger(trigger_file: str, server, **kwargs):
+    """Hook of mkdocs event `serve` watching the refresh trigger file.
+
+    Arguments:
+        trigger_file: Absolute path of the file touched to rebuild the
+            documentation,
+        server: Live reload server of `mkdocs serve`,
+        kwargs: Other arguments of the event, i.e. `config` and `builder`.
+
+    Returns:
+        The server, watching `trigger_file`.
+    """
+    # pylint: disable=W0613
+    # - W0613: Unused argument, mkdocs passes `config` and `builder` to hooks
+    server.watch(trigger_file)
+    return server
+
+
+def update_refresher(env: dict, nested_subrepo: list = ()) -> None:
+    """Start, update or stop the background refresher of subrepo.
+
+    While `mkdocs serve` runs, if `subrepo_config["refresh_interval"]` is set,
+    subrepo are refreshed every `refresh_interval` seconds by a
+    [SubrepoRefresher][plugins_refresh.SubrepoRefresher], kept across reloads. A
+    file of [CACHE_DIR][plugins_state.CACHE_DIR], see
+    [get_refresh_trigger_file][plugins_refresh.get_refresh_trigger_file], is
+    touched to rebuild the documentation when a subrepo changed. It is watched
+    by the server of `mkdocs serve` through its `serve` event, which runs once
+    after the first build, such that `refresh_interval` can be set while
+    serving. Subrepo locked in `subrepo.lock`, links to other subrepo and
+    subrepo never fetched, see
+    [get_fetch_max_age][plugins_fetch.get_fetch_max_age], are not refreshed.
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        nested_subrepo: List of tuples `(subrepo_dict, path)` returned by
+            [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+    """
+    state_module = get_state_module()
+    interval = None
+    if is_serving() and "subrepo" in env.variables:
+        trigger_file = get_refresh_trigger_file(env)
+        events = getattr(env.conf["plugins"], "events", {})
+        if "serve" in events:
+            events["serve"].append(
+                functools.partial(watch_refresh_trigger, trigger_file)
+            )
+        if get_subrepo_config(env, "fetch_policy") != "never":
+            interval = get_subrepo_config(env, "refresh_interval")
+    if state_module.refresher and state_module.refresher.interval != interval:
+        state_module.refresher.stop()
+        state_module.refresher = None
+    if not interval:
+        return
+
+    locked = {}
+    if get_subrepo_config(env, "lock", False):
+        locked = load_subrepo_lock(
+            os.path.join(env.project_dir, "docs", "_data", SUBREPO_LOCK_FILE)
+        )
+    subrepo = list_subrepo(env.variables["subrepo"], env.project_dir)
+    for i_subrepo, i_path in nested_subrepo:
+        subrepo += list_subrepo(i_subrepo, i_path)
+
+    if not state_module.refresher:
+        print(
+            f"{INFO_CLR}INFO [macros] - Refreshing subrepo every {interval} s "
+            f"in the background{RESET_CLR}"
+        )
+        state_module.refresher = SubrepoRefresher(interval, state_module)
+        state_module.refresher.start()
+    state_module.refresher.update(
+        [
+            (i_repo, i_root)
+            for i_repo, i_root in subrepo
+            if os.path.relpath(i_root, env.project_dir) not in locked
+            and not os.path.islink(i_root)
+        ],
+        get_fetch_config(env),
+        trigger_file,
+    )
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
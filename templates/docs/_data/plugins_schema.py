@@ -0,0 +1,669 @@
+"""Load data files, validated by compiled schemas and cached across builds.
+
+Module of [plugins.py][plugins], see
+[load_yaml_file][plugins_schema.load_yaml_file].
+"""
+
+# pylint: disable=R0801,C0415
+# - C0415: Import outside toplevel, heavy dependencies are imported on first
+#   use, see `typing.TYPE_CHECKING` below
+
+# Annotations naming lazily imported modules are not evaluated
+from __future__ import annotations
+
+# Build the YAML loader once
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# Secure hashes and message digests
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+
+# JSON encoder and decoder
+# https://docs.python.org/3/library/json.html
+import json
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Regular expression operations
+# https://docs.python.org/3/library/re.html
+import re
+
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
+# Names of lazily imported modules used in type hints
+# https://docs.python.org/3/library/typing.html
+import typing
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import CACHE_DIR, get_plugins_digest, traced
+
+# Following dependencies are slow to import and not always needed. They are
+# imported by methods using them, on first use, and only for type hints here.
+if typing.TYPE_CHECKING:
+    # Python lib/cli for JSON/YAML schema validation
+    # https://pypi.org/project/pykwalify/
+    from pykwalify.rule import Rule as SchemaRule
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+DATA_CACHE_STATS = {"hit": 0, "miss": 0}
+"""Number of data files loaded from, or missing in, the data files cache."""
+DATA_CACHE_STATS_GUARD = threading.Lock()
+"""Lock protecting the update of `DATA_CACHE_STATS` by subrepo workers."""
+YAML_12_RESOLVERS = {
+    "tag:yaml.org,2002:bool": re.compile(
+        r"^(?:true|True|TRUE|false|False|FALSE)$"
+    ),
+    "tag:yaml.org,2002:int": re.compile(
+        r"^(?:[-+]?0b[0-1_]+|[-+]?0o?[0-7_]+|[-+]?[0-9_]+"
+        r"|[-+]?0x[0-9a-fA-F_]+)$"
+    ),
+    "tag:yaml.org,2002:float": re.compile(
+        r"^(?:[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?"
+        r"|[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)"
+        r"|[-+]?\.[0-9_]+(?:[eE][-+][0-9]+)?|[-+]?\.(?:inf|Inf|INF)"
+        r"|\.(?:nan|NaN|NAN))$"
+    ),
+}
+"""YAML 1.2 grammar of implicit booleans and numbers, as resolved by ruamel."""
+SCHEMA_FILES = ("repo.schema.yaml", "subrepo.schema.yaml", "vars.schema.yaml")
+"""Name of schema files in `docs/_data/schema`."""
+SCHEMA_VALIDATORS = {}
+"""Compiled schema validators, by schema file and hash of its content."""
+SCHEMA_VALIDATORS_GUARD = threading.Lock()
+"""Lock protecting the compilation of validators in `SCHEMA_VALIDATORS`."""
+
+
+def get_data_cache_file(source_file: str, schema_file: str = None) -> tuple:
+    """Return the path of the cached content of a YAML file and its digest.
+
+    The cache file is named after the paths of the YAML file and of the schema
+    used to validate it, such that each YAML file has a single cache file,
+    replaced when the YAML file changes. The digest is the hash of the content
+    of both files and of `plugins.py` and its modules, see
+    [get_plugins_digest][plugins_state.get_plugins_digest], such that any
+    change to one of them, e.g. to the YAML loader, invalidates the cache file.
+
+    Arguments:
+        source_file: Absolute path of the YAML file,
+        schema_file: Absolute path of the schema of the YAML file, if any.
+
+    Returns:
+        Absolute path of the cache file in `data` of
+        [CACHE_DIR][plugins_state.CACHE_DIR] and digest of the YAML file and its
+        schema.
+    """
+    name = hashlib.sha256()
+    digest = hashlib.sha256(get_plugins_digest().encode())
+    for i_file in (source_file, schema_file):
+        if i_file:
+            name.update(os.path.abspath(i_file).encode())
+            with open(i_file, "rb") as file:
+                digest.update(file.read())
+        name.update(b"\0")
+        digest.update(b"\0")
+    return (
+        os.path.join(
+            os.path.expanduser(CACHE_DIR), "data", f"{name.hexdigest()}.json"
+        ),
+        digest.hexdigest(),
+    )
+
+
+def write_data_cache_file(cache_file: str, data_content) -> None:
+    """Store content, e.g. of a validated YAML file, in a cache file.
+
+    Content which would not be loaded identically from JSON, e.g. holding
+    dates or dictionaries with integer keys, is not cached.
+
+    Arguments:
+        cache_file: Absolute path of the cache file,
+        data_content: Content to store.
+    """
+    tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        content = json.dumps(data_content)
+        if json.loads(content) != data_content:
+            return
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, "w", encoding="UTF-8") as file:
+            file.write(content)
+        os.replace(tmp_file, cache_file)
+    except (OSError, TypeError, ValueError):
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+
+
+def check_schema_range(schema_range: dict, value) -> bool:
+    """Check a value, or a size, is within the `range` of a schema rule.
+
+    Arguments:
+        schema_range: Value of the `range` keyword of the rule,
+        value: Number to compare to the range.
+
+    Returns:
+        True if pykwalify would accept the value, False otherwise.
+    """
+    if not isinstance(value, (int, float)):
+        return False
+    return not (
+        ("max" in schema_range and schema_range["max"] < value)
+        or ("min" in schema_range and schema_range["min"] > value)
+        or ("max-ex" in schema_range and schema_range["max-ex"] <= value)
+        or ("min-ex" in schema_range and schema_range["min-ex"] >= value)
+    )
+
+
+def compile_schema_scalar(rule: SchemaRule):
+    """Compile a pykwalify scalar rule into a method checking a value.
+
+    Arguments:
+        rule: Scalar rule parsed by pykwalify.
+
+    Returns:
+        A method returning True if pykwalify would accept the value, or None
+        if the type of the rule is not supported.
+    """
+    from pykwalify.types import tt as schema_types
+
+    if rule.type in ("date", "timestamp") or rule.type not in schema_types:
+        return None
+    type_check = schema_types[rule.type]
+    enum = rule.enum
+    pattern = re.compile(rule.pattern, re.UNICODE) if rule.pattern else None
+    schema_range = rule.range
+
+    def check_type(value) -> bool:
+        try:
+            return bool(type_check(value))
+        except TypeError:
+            return False
+
+    def check_pattern(value) -> bool:
+        try:
+            return pattern.match(value) is not None
+        except TypeError:
+            return False
+
+    def check_range(value) -> bool:
+        if isinstance(value, (dict, list)):
+            return False
+        try:
+            value = len(value)
+        except TypeError:
+            pass
+        return check_schema_range(schema_range, value)
+
+    # Validators of keywords used by the rule, in the order pykwalify checks
+    validators = [
+        i_validator
+        for i_validator, i_used in (
+            (lambda value: value in enum, enum is not None),
+            (check_type, True),
+            (check_pattern, pattern is not None),
+            (check_range, schema_range is not None),
+        )
+        if i_used
+    ]
+
+    def check(value) -> bool:
+        return value is None or all(
+            i_validator(value) for i_validator in validators
+        )
+
+    return check
+
+
+def compile_schema_sequence(rule: SchemaRule, partials: dict):
+    """Compile a pykwalify sequence rule into a method checking a value.
+
+    Arguments:
+        rule: Sequence rule parsed by pykwalify,
+        partials: Dictionary of partial schemas, see
+            [compile_schema_rule][plugins_schema.compile_schema_rule].
+
+    Returns:
+        A method returning True if pykwalify would accept the value, or None
+        if the rule uses keywords which are not supported.
+    """
+    if len(rule.sequence) != 1 or rule.matching not in ("any", "all"):
+        return None
+    item_rule = rule.sequence[0]
+    if item_rule.type == "map" and item_rule.mapping is None:
+        return None
+    item_check = compile_schema_rule(item_rule, partials)
+    if item_check is None:
+        return None
+    schema_range = rule.range
+
+    def check(value) -> bool:
+        if value is None:
+            return True
+        if not isinstance(value, list):
+            return False
+        if not all(item_check(i_item) for i_item in value):
+            return False
+        return schema_range is None or check_schema_range(
+            schema_range, len(value)
+        )
+
+    return check
+
+
+def compile_schema_mapping(rule: SchemaRule, partials: dict):
+    """Compile a pykwalify mapping rule into a method checking a value.
+
+    Arguments:
+        rule: Mapping rule parsed by pykwalify,
+        partials: Dictionary of partial schemas, see
+            [compile_schema_rule][plugins_schema.compile_schema_rule].
+
+    Returns:
+        A method returning True if pykwalify would accept the value, or None
+        if the rule uses keywords which are not supported.
+    """
+    if rule.mapping is None:
+        return lambda value: isinstance(value, dict)
+
+    key_checks = {}
+    required_keys = []
+    required_regexes = []
+    for i_key, i_rule in rule.mapping.items():
+        key_checks[i_key] = compile_schema_rule(i_rule, partials)
+        if key_checks[i_key] is None:
+            return None
+        required = i_rule.required
+        if i_rule.include_name is not None:
+            # Only the partial schema tells if the key is required
+            if i_rule.include_name not in partials:
+                return None
+            required = partials[i_rule.include_name]["rule"].required
+        if not required or i_key == "=":
+            continue
+        if i_rule.map_regex_rule is not None:
+            required_regexes.append(re.compile(i_rule.map_regex_rule))
+        else:
+            required_keys.append(i_key)
+    regex_checks = [
+        (re.compile(i_rule.map_regex_rule), key_checks[i_key])
+        for i_key, i_rule in rule.mapping.items()
+        if i_rule.map_regex_rule is not None
+    ]
+    default_check = key_checks.get("=")
+    matching_rule = rule.matching_rule
+    schema_range = rule.range
+
+    def check_item(key, item) -> bool:
+        key_check = key_checks.get(key, default_check)
+        if key_check is not None:
+            return key_check(item)
+        if not regex_checks:
+            return bool(rule.allowempty_map)
+        matched = [
+            i_check
+            for i_regex, i_check in regex_checks
+            if i_regex.search(str(key))
+        ]
+        if (matching_rule == "any" and not matched) or (
+            matching_rule == "all" and len(matched) != len(regex_checks)
+        ):
+            return False
+        return all(i_check(item) for i_check in matched)
+
+    # Validators of keywords used by the rule, in the order pykwalify checks
+    validators = [
+        i_validator
+        for i_validator, i_used in (
+            (
+                lambda value: check_schema_range(schema_range, len(value)),
+                schema_range is not None,
+            ),
+            (
+                lambda value: all(i_key in value for i_key in required_keys),
+                required_keys,
+            ),
+            (
+                lambda value: all(
+                    any(i_regex.search(str(j_key)) for j_key in value)
+                    for i_regex in required_regexes
+                ),
+                required_regexes,
+            ),
+            (
+                lambda value: all(
+                    check_item(i_key, i_item) for i_key, i_item in value.items()
+                ),
+                True,
+            ),
+        )
+        if i_used
+    ]
+
+    def check(value) -> bool:
+        return isinstance(value, dict) and all(
+            i_validator(value) for i_validator in validators
+        )
+
+    return check
+
+
+def compile_schema_rule(rule: SchemaRule, partials: dict):
+    """Compile a pykwalify rule into a method checking a value against it.
+
+    The returned method does the same checks as `pykwalify.core.Core` for the
+    subset of keywords used by schemas in `docs/_data/schema` without
+    instanciating a `Core`, parsing the schema or building error messages
+    again. Keywords outside of this subset make the compilation fail.
+
+    Arguments:
+        rule: Rule parsed by pykwalify,
+        partials: Dictionary of partial schemas, by name, which values are
+            dictionaries with the parsed `rule` and its compiled `check`.
+
+    Returns:
+        A method returning True if pykwalify would accept the value, False
+        if pykwalify would report an error or raise an exception, or None if
+        the rule uses keywords which are not supported.
+    """
+    for i_keyword in ("assertion", "default", "func", "ident", "length"):
+        if getattr(rule, i_keyword) is not None:
+            return None
+    if rule.unique:
+        return None
+
+    if rule.include_name is not None:
+        include_name = rule.include_name
+
+        def check(value) -> bool:
+            # Partial schemas are looked up when validating as they can be
+            # recursive
+            partial = partials.get(include_name)
+            return partial is not None and partial["check"](value)
+
+    elif rule.sequence is not None:
+        check = compile_schema_sequence(rule, partials)
+    elif rule.mapping is not None or rule.allowempty_map:
+        check = compile_schema_mapping(rule, partials)
+    else:
+        check = compile_schema_scalar(rule)
+
+    if check is None or rule.type == "none":
+        return check
+    required = rule.required
+    nullable = rule.nullable
+
+    def check_rule(value) -> bool:
+        if value is None and (required or not nullable):
+            return False
+        return check(value)
+
+    return check_rule
+
+
+def compile_schema(schema_content: dict):
+    """Compile the content of a pykwalify schema into a validator.
+
+    Arguments:
+        schema_content: Content of a schema file, as loaded by pykwalify.
+
+    Returns:
+        A method returning True if pykwalify would accept a data file content,
+        or None if the schema uses keywords which are not supported.
+    """
+    from pykwalify.errors import PyKwalifyException
+    from pykwalify.rule import Rule as SchemaRule
+
+    if not isinstance(schema_content, dict) or "extensions" in schema_content:
+        return None
+    partials = {}
+    root_schema = {}
+    try:
+        for i_key, i_value in schema_content.items():
+            if i_key.startswith("schema;"):
+                partials[i_key.split(";", 1)[1]] = {
+                    "rule": SchemaRule(schema=i_value)
+                }
+            else:
+                root_schema[i_key] = i_value
+        root_rule = SchemaRule(schema=root_schema)
+    except PyKwalifyException:
+        return None
+
+    for i_partial in partials.values():
+        i_partial["check"] = compile_schema_rule(i_partial["rule"], partials)
+        if i_partial["check"] is None:
+            return None
+    return compile_schema_rule(root_rule, partials)
+
+
+def get_schema_validator(schema_file: str):
+    """Return the compiled validator of a schema file.
+
+    Schemas are compiled once per build, see
+    [compile_schema][plugins_schema.compile_schema], and compiled again only if
+    their content changed, e.g. while serving the documentation.
+
+    Arguments:
+        schema_file: Absolute path of the schema file.
+
+    Returns:
+        The compiled validator, or None if the schema can not be compiled.
+    """
+    with open(schema_file, "rb") as file:
+        schema_bytes = file.read()
+    key = (schema_file, hashlib.sha256(schema_bytes).hexdigest())
+    with SCHEMA_VALIDATORS_GUARD:
+        if key not in SCHEMA_VALIDATORS:
+            SCHEMA_VALIDATORS[key] = compile_schema(parse_yaml(schema_bytes))
+        return SCHEMA_VALIDATORS[key]
+
+
+def construct_yaml_12_int(loader, node) -> int:
+    """Build an integer from a YAML 1.2 scalar, as ruamel does.
+
+    Unlike YAML 1.1, octal integers start with `0o` and integers starting with
+    `0` are decimal, e.g. `017` is 17.
+
+    Arguments:
+        loader: YAML loader building the document,
+        node: Scalar node resolved as an integer.
+
+    Returns:
+        Value of the integer.
+    """
+    value = loader.construct_scalar(node).replace("_", "")
+    sign = 1
+    if value[0] in "+-":
+        sign = -1 if value[0] == "-" else 1
+        value = value[1:]
+    for i_prefix, i_base in (("0b", 2), ("0o", 8), ("0x", 16)):
+        if value.startswith(i_prefix):
+            return sign * int(value[2:], i_base)
+    return sign * int(value)
+
+
+@functools.lru_cache(maxsize=None)
+def get_yaml_loader(version: str = "1.2"):
+    """Build the fastest available safe YAML loader.
+
+    PyYAML is imported on first use. Its libyaml loader is used when PyYAML is
+    built with it, else its pure Python loader.
+
+    PyYAML implements YAML 1.1, where `yes`, `no`, `on` and `off` are booleans,
+    `1:30` is a sexagesimal number and `017` an octal number. Data files
+    validated by a schema were loaded by pykwalify with YAML 1.2 before, where
+    the first ones are strings and `017` is 17. For YAML 1.2, implicit
+    resolvers of booleans and numbers are thus replaced by the ones of
+    `YAML_12_RESOLVERS`, and integers are built by
+    [construct_yaml_12_int][plugins_schema.construct_yaml_12_int]. Other files,
+    e.g. `extra.yaml`, were loaded by PyYAML with YAML 1.1.
+
+    Arguments:
+        version: YAML version, `1.1` or `1.2`.
+
+    Returns:
+        The YAML loader class.
+    """
+    import yaml
+
+    base = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    if version == "1.1":
+        return base
+    loader = type("Yaml12Loader", (base,), {})
+    loader.yaml_implicit_resolvers = {
+        i_char: [
+            (j_tag, YAML_12_RESOLVERS.get(j_tag, j_regexp))
+            for j_tag, j_regexp in i_resolvers
+        ]
+        for i_char, i_resolvers in base.yaml_implicit_resolvers.items()
+    }
+    loader.add_constructor("tag:yaml.org,2002:int", construct_yaml_12_int)
+    return loader
+
+
+def parse_yaml(stream, version: str = "1.2"):
+    """Parse YAML with the fastest available safe loader.
+
+    See [get_yaml_loader][plugins_schema.get_yaml_loader].
+
+    Arguments:
+        stream: YAML content, as a string, bytes or an open file,
+        version: YAML version, `1.1` or `1.2`.
+
+    Returns:
+        Parsed content.
+    """
+    import yaml
+
+    return yaml.load(stream, Loader=get_yaml_loader(version))
+
+
+def read_yaml_file(source_file: str, version: str = "1.2"):
+    """Parse a YAML file, see [parse_yaml][plugins_schema.parse_yaml].
+
+    Arguments:
+        source_file: Absolute path of the YAML file,
+        version: YAML version, `1.1` or `1.2`.
+
+    Returns:
+        Content of the YAML file.
+    """
+    with open(source_file, encoding="UTF-8") as file:
+        return parse_yaml(file, version)
+
+
+def validate_yaml_file(source_file: str, schema_file: str):
+    """Validate a YAML file against a schema and return its content.
+
+    The file is parsed once, see
+    [read_yaml_file][plugins_schema.read_yaml_file], and its content is checked
+    by the compiled validator of the schema, see
+    [get_schema_validator][plugins_schema.get_schema_validator]. Only when it is
+    rejected, or when the schema could not be compiled, pykwalify validates the
+    parsed content again to raise its usual error.
+
+    Arguments:
+        source_file: Absolute path of the YAML file,
+        schema_file: Absolute path of the schema of the YAML file.
+
+    Returns:
+        Content of the YAML file.
+    """
+    from pykwalify.core import Core as yamlschema
+
+    if not os.path.isfile(source_file) or not os.path.isfile(schema_file):
+        schema = yamlschema(source_file=source_file, schema_files=[schema_file])
+        schema.validate(raise_exception=True)
+        return schema.source
+
+    with traced("read_yaml_file", file=source_file):
+        data_content = read_yaml_file(source_file)
+    with traced("validate_yaml_file", file=source_file, schema=schema_file):
+        validator = get_schema_validator(schema_file)
+        if (
+            data_content is None
+            or validator is None
+            or not validator(data_content)
+        ):
+            schema = yamlschema(
+                source_data=data_content, schema_files=[schema_file]
+            )
+            schema.validate(raise_exception=True)
+    return data_content
+
+
+def load_yaml_file(path: str, filename: str) -> None:
+    """Ensure a YAML file is valid again a schema and return its content.
+
+    Depending on the name of the YAML file, compare its content to a schema to
+    validate its content. If content is not valid, an error will be raised.
+    Otherwise, its content will be returned.
+
+    If filename is `extra.yml` or `extra.yaml`, load content of the file
+    unconditionnally, with YAML 1.1, see
+    [get_yaml_loader][plugins_schema.get_yaml_loader].
+
+    Validated content is stored in a cache, see
+    [get_data_cache_file][plugins_schema.get_data_cache_file], such that a file
+    which content and schema did not change is neither parsed nor validated
+    again.
+
+    Arguments:
+        path: Base path where YAML files are.
+        filename: Name of the YAML file to load.
+    """
+    source_file = os.path.join(path, filename)
+    schema_file = None
+    data_type = ""
+
+    if filename not in ("extra.yaml", "extra.yml"):
+        schema_file = os.path.join(path, "schema")
+        if filename in ("subrepo.yaml", "subrepo.yml"):
+            schema_file = os.path.join(schema_file, "subrepo.schema.yaml")
+        elif filename in ("vars.yaml", "vars.yml"):
+            schema_file = os.path.join(schema_file, "vars.schema.yaml")
+        else:
+            schema_file = os.path.join(schema_file, "repo.schema.yaml")
+            data_type = "repo"
+
+    cache_file = None
+    if os.path.isfile(source_file) and (
+        not schema_file or os.path.isfile(schema_file)
+    ):
+        cache_file, digest = get_data_cache_file(source_file, schema_file)
+        try:
+            with open(cache_file, encoding="UTF-8") as file:
+                cache = json.load(file)
+            if cache["digest"] == digest:
+                with DATA_CACHE_STATS_GUARD:
+                    DATA_CACHE_STATS["hit"] += 1
+                return cache["content"], data_type
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        with DATA_CACHE_STATS_GUARD:
+            DATA_CACHE_STATS["miss"] += 1
+
+    if schema_file:
+        data_content = validate_yaml_file(source_file, schema_file)
+    else:
+        # Loaded by PyYAML, with YAML 1.1, unlike validated files
+        with traced("read_yaml_file", file=source_file):
+            data_content = read_yaml_file(source_file, "1.1")
+
+    if cache_file:
+        write_data_cache_file(
+            cache_file, {"digest": digest, "content": data_content}
+        )
+    return data_content, data_type
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
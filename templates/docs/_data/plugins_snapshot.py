@@ -0,0 +1,259 @@
+"""Snapshot the configuration of a build, reused by unchanged builds.
+
+Module of [plugins.py][plugins], see
+[take_snapshot][plugins_snapshot.take_snapshot].
+"""
+
+# pylint: disable=R0801
+
+# Copy variables of the snapshot
+# https://docs.python.org/3/library/copy.html
+import copy
+
+# Secure hashes and message digests
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+
+# JSON encoder and decoder
+# https://docs.python.org/3/library/json.html
+import json
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Time access and conversions
+# https://docs.python.org/3/library/time.html
+import time
+
+# Data files validated by compiled schemas and cached
+# docs/_data/plugins_schema.py
+from plugins_schema import SCHEMA_FILES, write_data_cache_file
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import GIT_CONTEXT, get_head_commit, get_plugins_files
+
+# Data files of subrepo merged into the configuration
+# docs/_data/plugins_subrepo.py
+from plugins_subrepo import list_subrepo
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+SNAPSHOT_CONF_KEYS = (
+    "site_name",
+    "site_desc",
+    "site_url",
+    "copyright",
+    "repo_name",
+    "repo_url",
+    "nav",
+)
+"""Keys of the mkdocs configuration updated by the dynamic configuration."""
+
+
+def get_build_fingerprint(env: dict, nested_subrepo: list = ()) -> str:
+    """Compute the fingerprint of every input of the dynamic configuration.
+
+    Inputs are `plugins.py` and its modules, the mkdocs configuration file,
+    files in `docs/_data` and its schemas, `HEAD` and `origin` of the repo,
+    the current year and, for every subrepo, its `HEAD`, its repo file and its
+    sparse checkout patterns. Subrepo must be fetched before, such that a
+    snapshot only skips the work done once subrepo are fetched.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary,
+        nested_subrepo: List of tuples `(subrepo_dict, path)` returned by
+            [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+
+    Returns:
+        The SHA256 of inputs.
+    """
+    data_dir = os.path.join(env.project_dir, "docs", "_data")
+    schema_dir = os.path.join(data_dir, "schema")
+    paths = get_plugins_files() + [env.conf["config_file_path"]]
+    paths += [
+        os.path.join(data_dir, i_file)
+        for i_file in sorted(os.listdir(data_dir))
+        if i_file.endswith((".yml", ".yaml", ".lock"))
+    ]
+    paths += [os.path.join(schema_dir, i_file) for i_file in SCHEMA_FILES]
+
+    git_repo = GIT_CONTEXT.repo(env.project_dir, search_parent_directories=True)
+    inputs = [
+        get_head_commit(git_repo.working_tree_dir),
+        git_repo.remotes.origin.url if git_repo.remotes else None,
+        time.strftime("%Y", time.localtime()),
+    ]
+    subrepo = list_subrepo(env.variables.get("subrepo", {}), env.project_dir)
+    for i_subrepo, i_path in nested_subrepo:
+        subrepo += list_subrepo(i_subrepo, i_path)
+    for i_repo, i_root in subrepo:
+        inputs.append(get_head_commit(i_root))
+        paths += [
+            os.path.join(
+                i_root,
+                i_repo.get("subpath", ""),
+                "docs",
+                "_data",
+                f"{i_repo['name']}.yaml",
+            ),
+            os.path.join(i_root, ".git", "info", "sparse-checkout"),
+        ]
+
+    digest = hashlib.sha256(json.dumps(inputs).encode())
+    for i_path in paths:
+        digest.update(i_path.encode() + b"\0")
+        if os.path.isfile(i_path):
+            with open(i_path, "rb") as file:
+                digest.update(file.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_setup_commands(env: dict) -> list:
+    """Return the mkdocstrings python `setup_commands`, if any.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary.
+
+    Returns:
+        The list of setup commands, or None if mkdocstrings is not used.
+    """
+    if "mkdocstrings" not in env.conf["plugins"]:
+        return None
+    return env.conf["plugins"]["mkdocstrings"].config.data["handlers"][
+        "python"
+    ]["setup_commands"]
+
+
+def copy_variables(env: dict) -> dict:
+    """Copy variables, to find those the dynamic configuration updates.
+
+    Dictionaries and lists are deeply copied, such that variables updated in
+    place, e.g. `git`, differ from their copy. Other values, e.g. the mkdocs
+    configuration, are not copied.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary.
+
+    Returns:
+        Copy of `env.variables`.
+    """
+    return {
+        i_key: copy.deepcopy(i_value)
+        if isinstance(i_value, (dict, list))
+        else i_value
+        for i_key, i_value in env.variables.items()
+    }
+
+
+def take_snapshot(env: dict, variables: dict) -> dict:
+    """Capture the dynamic configuration done on mkdocs configuration.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary,
+        variables: Copy of `env.variables` before the dynamic configuration,
+            see [copy_variables][plugins_snapshot.copy_variables].
+
+    Returns:
+        Dictionary with keys `variables`, set or replaced variables, `items`,
+        set or replaced items of dictionary variables, `conf`, updated keys of
+        the configuration, `theme`, updated keys of the theme,
+        `setup_commands` and `monorepo`, True if plugin monorepo is kept.
+    """
+    theme_keys = list(env.variables.get("theme", {})) + [
+        "logo",
+        "icon",
+        "favicon",
+    ]
+    snapshot_variables = {}
+    snapshot_items = {}
+    for i_key, i_value in env.variables.items():
+        previous = variables.get(i_key)
+        if isinstance(i_value, dict) and isinstance(previous, dict):
+            # Only updated items are stored, others may not be JSON, e.g. the
+            # date of variable `git`
+            items = {
+                j_key: j_value
+                for j_key, j_value in i_value.items()
+                if j_key not in previous or previous[j_key] != j_value
+            }
+            if items:
+                snapshot_items[i_key] = items
+        elif i_key not in variables or previous != i_value:
+            snapshot_variables[i_key] = i_value
+    return {
+        "variables": snapshot_variables,
+        "items": snapshot_items,
+        "conf": {
+            i_key: env.conf[i_key]
+            for i_key in SNAPSHOT_CONF_KEYS
+            if i_key in env.conf
+        },
+        "theme": {
+            i_key: env.conf["theme"][i_key]
+            for i_key in theme_keys
+            if i_key in env.conf["theme"]
+        },
+        "setup_commands": get_setup_commands(env),
+        "monorepo": "monorepo" in env.conf["plugins"],
+    }
+
+
+def apply_snapshot(env: dict, snapshot: dict) -> None:
+    """Apply a snapshot of the dynamic configuration on mkdocs configuration.
+
+    Arguments:
+        env: Mkdocs macro plugin environment dictionary,
+        snapshot: Snapshot, see [take_snapshot][plugins_snapshot.take_snapshot].
+    """
+    env.variables.update(snapshot["variables"])
+    for i_key, i_items in snapshot["items"].items():
+        env.variables[i_key].update(i_items)
+    for i_key, i_value in snapshot["conf"].items():
+        env.conf[i_key] = i_value
+    for i_key, i_value in snapshot["theme"].items():
+        env.conf["theme"][i_key] = i_value
+    setup_commands = get_setup_commands(env)
+    if setup_commands is not None and snapshot["setup_commands"] is not None:
+        setup_commands[:] = snapshot["setup_commands"]
+    if not snapshot["monorepo"]:
+        env.conf["plugins"].pop("monorepo", None)
+
+
+def load_snapshot(snapshot_file: str) -> dict:
+    """Load a snapshot of the dynamic configuration, if it exists.
+
+    Arguments:
+        snapshot_file: Absolute path of the snapshot, named after the
+            fingerprint of its inputs, see
+            [get_build_fingerprint][plugins_snapshot.get_build_fingerprint].
+
+    Returns:
+        The snapshot, or None if there is none for these inputs.
+    """
+    try:
+        with open(snapshot_file, encoding="UTF-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(snapshot_file: str, snapshot: dict) -> None:
+    """Store a snapshot of the dynamic configuration.
+
+    Snapshots which would not be loaded identically from JSON, e.g. holding
+    dates or dictionaries with integer keys, are not stored.
+
+    Arguments:
+        snapshot_file: Absolute path of the snapshot,
+        snapshot: Snapshot, see [take_snapshot][plugins_snapshot.take_snapshot].
+    """
+    write_data_cache_file(snapshot_file, snapshot)
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
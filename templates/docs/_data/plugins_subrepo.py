@@ -0,0 +1,446 @@
+"""Merge data files of subrepo into the configuration.
+
+Module of [plugins.py][plugins], see
+[update_subrepo][plugins_subrepo.update_subrepo].
+"""
+
+# pylint: disable=R0801
+
+# Bind arguments of phases of the build
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Thread-based parallelism
+# https://docs.python.org/3/library/threading.html
+import threading
+
+# Time access and conversions
+# https://docs.python.org/3/library/time.html
+import time
+
+# Data files validated by compiled schemas and cached
+# docs/_data/plugins_schema.py
+from plugins_schema import load_yaml_file
+
+# State kept across builds, timing and tracing of phases
+# docs/_data/plugins_state.py
+from plugins_state import (
+    GIT_CONTEXT,
+    get_files_fingerprint,
+    get_head_commit,
+    run_phase,
+    timed_call,
+    traced,
+)
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+SRC_PATHS = {}
+"""Ordered set, as dictionary keys, of `src_path` of repos and subrepo."""
+SUBREPO_PIPELINE = {}
+"""Futures of repo files of subrepo loaded as soon as they are fetched."""
+PIPELINE_STATS = {
+    "validated": 0,
+    "queue": 0,
+    "max_queue": 0,
+    "fetch": 0.0,
+    "queue_wait": 0.0,
+    "validate": 0.0,
+    "merge_wait": 0.0,
+}
+"""Queue depth and time spent, in seconds, by stages of the subrepo pipeline."""
+PIPELINE_STATS_GUARD = threading.Lock()
+"""Lock protecting the update of `PIPELINE_STATS` by pipeline stages."""
+
+
+# pylint: disable=R0913
+# - R0913: Too many arguments
+def update_subrepo_logo_src(
+    env: dict,
+    curr_repo: dict,
+    repo_name: str,
+    subrepo_dict: dict,
+    path: str,
+    external: bool,
+) -> None:
+    """Update the content of the key `logo` and `src_path` of subrepo.
+
+    Update value of keys `logo` and `src_path` of cloned subrepo, i.e. value
+    from file `docs/_data/repo.yaml` in the cloned subrepo, relative to the main
+    repo holding the documentation.
+
+    Folders of `src_path` are added to [SRC_PATHS][plugins_subrepo.SRC_PATHS].
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        curr_repo : Repo dictionary from `repo.yml` file in `docs/_data/` in the
+            cloned subrepo,
+        repo_name: Name of the repo,
+        subrepo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        path: Absolute path of the location of the cloned subrepo,
+        external: Boolean to know if current repo is an external subrepo.
+    """
+    logo_subpath = ""
+    src_subpath = ""
+    if external:
+        logo_subpath = os.path.join(subrepo_dict["online_url"])
+
+    src_subpath = os.path.join(
+        path.replace(f"{env.project_dir}/", ""), repo_name
+    )
+
+    if "logo" not in curr_repo:
+        curr_repo["logo"] = os.path.join(
+            logo_subpath, "assets", "img", "meta", f"{repo_name}_logo.png"
+        )
+    if "src_path" in curr_repo:
+        for i_src in curr_repo["src_path"]:
+            SRC_PATHS[os.path.join(src_subpath, i_src)] = None
+
+
+def get_subrepo_config(env: dict, key: str, default=None):
+    """Return the value of a key of `subrepo_config` from `docs/_data/vars.yml`.
+
+    Arguments:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        key: Key of `env.variables["subrepo_config"]` to return,
+        default: Value returned if `key` is not defined.
+
+    Returns:
+        The value of `env.variables["subrepo_config"][key]` if defined, else
+        `default`.
+    """
+    if "subrepo_config" in env.variables and env.variables["subrepo_config"]:
+        return env.variables["subrepo_config"].get(key, default)
+    return default
+
+
+def add_sparse_src_path(subrepo_root: str, data: dict) -> None:
+    """Add `src_path` folders of a subrepo to its sparse checkout.
+
+    Args:
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        data: Content of the file `docs/_data/repo.yaml` of the subrepo.
+    """
+    src_path = []
+    for i_repo_info in data:
+        src_path += data[i_repo_info].get("src_path", [])
+    if src_path:
+        GIT_CONTEXT.repo(subrepo_root).git.sparse_checkout("add", *src_path)
+
+
+def list_subrepo(subrepo_dict: dict, path: str) -> list:
+    """Flatten the tree of subrepo defined in `env.variables['subrepo']`.
+
+    Recursively parse dictionary `subrepo_dict` the same way
+    [update_subrepo][plugins_subrepo.update_subrepo] does and return every
+    subrepo with the path where it is cloned, in the order they are defined.
+
+    Args:
+        subrepo_dict: Dictionary storing subrepo,
+        path: Absolute path of the location of the cloned subrepo.
+
+    Returns:
+        A list of tuple `(repo_dict, subrepo_root)`.
+    """
+    subrepo_list = []
+    for i_key in subrepo_dict:
+        if isinstance(subrepo_dict[i_key], list):
+            for i_repo in subrepo_dict[i_key]:
+                subrepo_list.append(
+                    (i_repo, os.path.join(path, i_repo["name"]))
+                )
+        elif i_key not in ["nav_entry"]:
+            subrepo_list += list_subrepo(
+                subrepo_dict[i_key], os.path.join(path, i_key)
+            )
+    return subrepo_list
+
+
+def get_subrepo_data_file(repo_dict: dict, subrepo_root: str) -> str:
+    """Return the path of the repo file of a subrepo.
+
+    Args:
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo.
+
+    Returns:
+        Absolute path of the file `docs/_data/<name>.yaml` of the subrepo, in
+        `subpath` if defined.
+    """
+    return os.path.join(
+        subrepo_root,
+        repo_dict.get("subpath", ""),
+        "docs",
+        "_data",
+        f"{repo_dict['name']}.yaml",
+    )
+
+
+def run_subrepo_data_phase(env: dict, repo_dict: dict, subrepo_root: str):
+    """Load the repo file of a subrepo, unless it did not change.
+
+    See [run_phase][plugins_state.run_phase] and
+    [load_subrepo_data][plugins_subrepo.load_subrepo_data].
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo.
+
+    Returns:
+        Content of the repo file of the subrepo.
+    """
+    data_file = get_subrepo_data_file(repo_dict, subrepo_root)
+    checkout = get_subrepo_config(env, "checkout", "full")
+    return run_phase(
+        f"subrepo {subrepo_root}",
+        functools.partial(
+            get_subrepo_data_inputs, subrepo_root, data_file, checkout
+        ),
+        functools.partial(
+            timed_call,
+            "load_subrepo_data "
+            f"{os.path.relpath(subrepo_root, env.project_dir)}",
+            load_subrepo_data,
+            subrepo_root,
+            data_file,
+            checkout,
+        ),
+    )
+
+
+def validate_subrepo(
+    env: dict, repo_dict: dict, subrepo_root: str, queued: float
+):
+    """Validation stage of the subrepo pipeline.
+
+    Run by the worker of [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo]
+    once a subrepo is fetched, see
+    [run_subrepo_data_phase][plugins_subrepo.run_subrepo_data_phase].
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        repo_dict: Dictionary of the repo as defined in file `subrepo.yaml`
+            in `docs/_data`,
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        queued: Value of `time.perf_counter()` when the subrepo was fetched.
+
+    Returns:
+        Content of the repo file of the subrepo.
+    """
+    start = time.perf_counter()
+    try:
+        return run_subrepo_data_phase(env, repo_dict, subrepo_root)
+    finally:
+        with PIPELINE_STATS_GUARD:
+            PIPELINE_STATS["validated"] += 1
+            PIPELINE_STATS["queue"] -= 1
+            PIPELINE_STATS["queue_wait"] += start - queued
+            PIPELINE_STATS["validate"] += time.perf_counter() - start
+
+
+def load_subrepo_data(subrepo_root: str, data_file: str, checkout: str):
+    """Load the repo file of a fetched subrepo.
+
+    Args:
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        data_file: Absolute path of the file `docs/_data/<name>.yaml` of the
+            subrepo,
+        checkout: Either `full` or `sparse`, see
+            [fetch_subrepo][plugins_fetch.fetch_subrepo].
+
+    Returns:
+        Content of the repo file of the subrepo.
+    """
+    data, _ = load_yaml_file(os.path.dirname(data_file), data_file)
+    if checkout == "sparse":
+        add_sparse_src_path(subrepo_root, data)
+    return data
+
+
+def get_subrepo_data_inputs(
+    subrepo_root: str, data_file: str, checkout: str
+) -> tuple:
+    """Return inputs of [load_subrepo_data][plugins_subrepo.load_subrepo_data].
+
+    Args:
+        subrepo_root: Absolute path of the location of the cloned subrepo,
+        data_file: Absolute path of the file `docs/_data/<name>.yaml` of the
+            subrepo,
+        checkout: Either `full` or `sparse`.
+
+    Returns:
+        Tuple of the commit checked out in the subrepo, the checkout mode and
+        the fingerprint of the repo file.
+    """
+    return (
+        get_head_commit(subrepo_root),
+        checkout,
+        get_files_fingerprint([data_file]),
+    )
+
+
+def update_subrepo_info(
+    env: dict, subrepo_list: dict, path: str, external: bool = False
+) -> dict:
+    """Load already fetched subrepo information and update values if needed.
+
+    Load repo information of subrepo defined from subpart of
+    `env.variables['subrepo'], previously cloned or pulled by
+    [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo], i.e. load file
+    `docs/_data/repo.yaml` in the subrepo, and update needed keys.
+
+    This is the merge stage of the subrepo pipeline: repo files already
+    loaded by [validate_subrepo][plugins_subrepo.validate_subrepo] are merged in
+    the order subrepo are defined, waiting for them if needed, such that the
+    result does not depend on which subrepo is fetched first.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        subrepo_list: List of dictionary storing subrepo dict,
+        path: Absolute path of the location of the cloned subrepo,
+        external: Boolean to know if current repo is an external subrepo.
+
+    Return:
+        A updating dictionary storing subrepo information
+    """
+    return_dict = {}
+    for i_repo in subrepo_list:
+        subrepo_root = os.path.join(path, i_repo["name"])
+        pending = SUBREPO_PIPELINE.pop(subrepo_root, None)
+        if pending:
+            start = time.perf_counter()
+            data = pending.result()
+            wait = time.perf_counter() - start
+            with PIPELINE_STATS_GUARD:
+                PIPELINE_STATS["merge_wait"] += wait
+        else:
+            data = run_subrepo_data_phase(env, i_repo, subrepo_root)
+        for i_repo_info in data:
+            curr_repo = data[i_repo_info]
+            with traced("update_subrepo_logo_src", repo=i_repo_info):
+                update_subrepo_logo_src(
+                    env, curr_repo, i_repo_info, i_repo, path, external
+                )
+        return_dict.update(data)
+    return return_dict
+
+
+def update_subrepo(
+    env: dict, subrepo_dict: dict, path: str, external: bool
+) -> dict:
+    """Recursively parse `env.variables['subrepo']`.
+
+    Recursively parse dictionary `env.variables['subrepo']`, from file
+    `docs/_data/subrepo.yaml`. Depending on the key:
+
+    - `nav_entry`: Do a recursion of this method,
+    - `external` or `internal`: Parse the list to update subrepo information
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        subrepo_dict: Dictionary storing subrepo,
+        path: Absolute path of the location of the cloned subrepo,
+        external: Boolean to know if current repo is an external subrepo.
+
+    Returns:
+        An updated dictionary of repo informations.
+    """
+    return_dict = {}
+    for i_key in subrepo_dict:
+        if isinstance(subrepo_dict[i_key], list):
+            if i_key == "external":
+                external = True
+            elif i_key == "internal":
+                env.variables["internal_subdoc"] = True
+            return_dict.update(
+                update_subrepo_info(env, subrepo_dict[i_key], path, external)
+            )
+        elif i_key not in ["nav_entry"]:
+            return_dict.update(
+                update_subrepo(
+                    env,
+                    subrepo_dict[i_key],
+                    os.path.join(path, i_key),
+                    external,
+                )
+            )
+    return return_dict
+
+
+def update_nested_subrepo(env: dict, nested_subrepo: list) -> dict:
+    """Parse subrepo of subrepo, found by `subrepo_config["recursive"]`.
+
+    See [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo]. Information of a
+    repo already known is not overridden.
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        nested_subrepo: List of tuples `(subrepo_dict, path)` returned by
+            [fetch_all_subrepo][plugins_fetch.fetch_all_subrepo].
+
+    Returns:
+        An updated dictionary of repo informations.
+    """
+    # Only subrepo of the current repo are included in its navigation
+    internal_subdoc = env.variables["internal_subdoc"]
+    return_dict = {}
+    for i_subrepo, i_path in nested_subrepo:
+        for i_name, i_info in update_subrepo(
+            env, i_subrepo, i_path, False
+        ).items():
+            return_dict.setdefault(i_name, i_info)
+    env.variables["internal_subdoc"] = internal_subdoc
+    return return_dict
+
+
+def update_logo_src_repo(
+    env: dict, curr_repo: dict, repo_name: str, path: str = None
+) -> None:
+    """Update the content of the key `logo` and `src_path` of current repo.
+
+    Update value of keys `logo` and `src_path` of current repo holding the
+    documentation.
+
+    Folders of `src_path` are added to [SRC_PATHS][plugins_subrepo.SRC_PATHS].
+
+    Args:
+        env : Environment dictionary provided by
+            [mkdocs-macros-plugin](https://mkdocs-macros-plugin.readthedocs.io/)
+        curr_repo : Repo dictionary from `repo.yml` file in `docs/_data/` in the
+            cloned subrepo,
+        repo_name: Name of the repo,
+        path: Absolute path of the location of the current repo.
+    """
+    subpath = ""
+    if path:
+        subpath = os.path.join(path.replace(env.project_dir, ""), repo_name)
+
+    if "logo" not in curr_repo:
+        curr_repo["logo"] = os.path.join(
+            subpath, "assets", "img", "meta", f"{repo_name}_logo.png"
+        )
+    if "src_path" in curr_repo:
+        for i_src in curr_repo["src_path"]:
+            SRC_PATHS[os.path.join(subpath, i_src)] = None
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
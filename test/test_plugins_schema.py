@@ -0,0 +1,72 @@
+"""Check compiled schema validators of `plugins_schema.py` against pykwalify.
+
+Compiled validators replace pykwalify when loading data files, they must
+accept and reject exactly the same documents. Each schema of
+`docs/_data/schema`, and a schema using every supported keyword, is checked on
+valid documents and all their single mutations, as scenario `schema` of
+`tools/benchmark_plugins.py` does.
+"""
+
+# Silence pykwalify errors on rejected documents
+# https://docs.python.org/3/library/logging.html
+import logging
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# System-specific parameters and functions
+# https://docs.python.org/3/library/sys.html
+import sys
+
+# Python testing framework
+# https://pypi.org/project/pytest/
+import pytest
+
+# Scenarios of the benchmark are in `tools`, which is in `sys.path` only while
+# importing them.
+TOOLS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"
+)
+sys.path.insert(0, TOOLS_PATH)
+try:
+    # pylint: disable=E0401
+    # - E0401: Unable to import, `tools` is not in `sys.path` of pylint
+    # Generate documents valid against each schema
+    # tools/benchmark_fixtures.py
+    from benchmark_fixtures import get_schema_cases
+
+    # Compare compiled validators and pykwalify on a schema
+    # tools/benchmark_plugins.py
+    from benchmark_plugins import check_schema_case, load_plugins
+finally:
+    sys.path.remove(TOOLS_PATH)
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+SCHEMA_CASES = get_schema_cases()
+"""Schemas and their valid documents, by name of case."""
+
+
+@pytest.mark.parametrize("name", list(SCHEMA_CASES))
+def test_compiled_schema_matches_pykwalify(name: str) -> None:
+    """Check the compiled validator of a schema agrees with pykwalify.
+
+    Arguments:
+        name: Name of the case, key of `SCHEMA_CASES`.
+    """
+    plugins_schema = load_plugins("plugins_schema")
+    logging.getLogger("pykwalify").setLevel(logging.CRITICAL)
+    schema_file, contents = SCHEMA_CASES[name]
+    results = {}
+    mismatches = check_schema_case(
+        plugins_schema, name, schema_file, contents, results
+    )
+    assert results[f"{name} documents"] > len(contents)
+    assert not mismatches, mismatches[:10]
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
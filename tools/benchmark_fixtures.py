@@ -0,0 +1,584 @@
+"""Generate synthetic inputs of the scenarios of `benchmark_plugins.py`.
+
+Every input is generated under a temporary folder given by the caller, such
+that scenarios run fully offline and leave no file behind.
+"""
+
+# Options of the generated workspace
+# https://docs.python.org/3/library/argparse.html
+import argparse
+
+# Deep copy of mutated documents
+# https://docs.python.org/3/library/copy.html
+import copy
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Copy schema files
+# https://docs.python.org/3/library/shutil.html
+import shutil
+
+# Run git commands on generated repos
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+
+# YAML parser and emitter for Python
+# https://pypi.org/project/PyYAML/
+import yaml
+
+# Python lib/cli for JSON/YAML schema validation
+# https://pypi.org/project/pykwalify/
+from pykwalify.compat import yml
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+
+MKDOCS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""Root of the repo."""
+
+
+PLUGINS_PATH = os.path.join(MKDOCS_ROOT, "templates", "docs", "_data")
+"""Folder storing the benchmarked `plugins.py`."""
+
+
+SCHEMA_SAMPLES = [
+    None,
+    0,
+    3,
+    -1,
+    1.5,
+    "1e-06",
+    True,
+    False,
+    "",
+    "text",
+    "full",
+    "http://example.org",
+    "user@example.org",
+    [],
+    ["text"],
+    [{"name": "text"}],
+    {},
+    {"name": "text"},
+]
+"""Values replacing each value of documents to build invalid documents."""
+
+
+SCHEMA_UNKNOWN_KEYS = ["unknown", "name", "two words", "!!", 5]
+"""Keys added to each mapping of documents to build invalid documents."""
+
+
+SCHEMA_FEATURES = {
+    "schema;node": {
+        "type": "map",
+        "mapping": {
+            "value": {"type": "int", "required": True},
+            "children": {"type": "seq", "sequence": [{"include": "node"}]},
+        },
+    },
+    "type": "map",
+    "mapping": {
+        "tree": {"include": "node"},
+        "enum": {"type": "str", "enum": ["full", "sparse"]},
+        "int_range": {"type": "int", "range": {"min": 1, "max-ex": 4}},
+        "str_range": {"type": "str", "range": {"max": 4, "min-ex": 0}},
+        "pattern": {"type": "str", "pattern": "^[a-z]+$"},
+        "not_nullable": {"type": "text", "nullable": False},
+        "number": {"type": "number"},
+        "float": {"type": "float"},
+        "scalar": {"type": "scalar"},
+        "any": {"type": "any"},
+        "email": {"type": "email"},
+        "url": {"type": "url"},
+        "none": {"type": "none"},
+        "seq_range": {
+            "type": "seq",
+            "range": {"min": 1},
+            "sequence": [{"type": "bool"}],
+        },
+        "all_regex": {
+            "type": "map",
+            "matching-rule": "all",
+            "range": {"max": 2},
+            "mapping": {
+                "regex;(na)": {"type": "str"},
+                "re;(me)": {"type": "str"},
+            },
+        },
+        "default_key": {
+            "type": "map",
+            "mapping": {"name": {"type": "str"}, "=": {"type": "int"}},
+        },
+        "empty": {"type": "map", "allowempty": True},
+    },
+}
+"""Schema using every keyword supported by compiled validators."""
+
+
+SCHEMA_FEATURES_DOC = {
+    "tree": {"value": 1, "children": [{"value": 2}, {"value": 3}]},
+    "enum": "full",
+    "int_range": 3,
+    "str_range": "text",
+    "pattern": "text",
+    "not_nullable": 1.5,
+    "number": "1e-06",
+    "float": 1.5,
+    "scalar": "text",
+    "any": [],
+    "email": "user@example.org",
+    "url": "http://example.org",
+    "none": None,
+    "seq_range": [True],
+    "all_regex": {"name": "text"},
+    "default_key": {"name": "text", "other": 3},
+    "empty": {"name": "text"},
+}
+"""Document valid against `SCHEMA_FEATURES`."""
+
+
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@example.org",
+    "GIT_COMMITTER_NAME": "benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@example.org",
+}
+"""Git identity used to commit in generated repos."""
+
+
+def generate_nav(width: int, depth: int, prefix: str = "") -> list:
+    """Generate a `nav` with `width` entries per level on `depth` levels.
+
+    Arguments:
+        width: Number of entries per level,
+        depth: Number of levels,
+        prefix: Prefix of titles (used for recursion).
+
+    Returns:
+        The generated `nav`.
+    """
+    nav = []
+    for i_entry in range(width):
+        title = f"{prefix}Entry {i_entry}"
+        if depth > 1:
+            nav.append({title: generate_nav(width, depth - 1, f"{title} / ")})
+        else:
+            nav.append({title: f"{title.replace(' ', '_')}.md"})
+    return nav
+
+
+def load_yml(path: str):
+    """Load a YAML file the same way pykwalify does.
+
+    Arguments:
+        path: Path of the YAML file.
+
+    Returns:
+        Content of the YAML file.
+    """
+    with open(path, encoding="UTF-8") as file:
+        return yml.load(file)
+
+
+def generate_subrepo(groups: int, subrepo: int) -> dict:
+    """Generate the content of a valid `subrepo.yaml` with nested groups.
+
+    Arguments:
+        groups: Number of groups of subrepo,
+        subrepo: Number of subrepo per group.
+
+    Returns:
+        Content of the generated `subrepo.yaml`.
+    """
+    content = {}
+    for i_group in range(groups):
+        group = {
+            "nav_entry": f"Group {i_group}",
+            "internal": [
+                {
+                    "name": f"repo_{i_repo}",
+                    "git_url": f"https://example.org/repo_{i_repo}.git",
+                    "nav_entry": f"Repo {i_repo}",
+                    "subpath": "docs",
+                }
+                for i_repo in range(subrepo)
+            ],
+            "external": [
+                {
+                    "name": f"ext_{i_repo}",
+                    "git_url": f"git@example.org:ext_{i_repo}.git",
+                    "nav_entry": f"Ext {i_repo}",
+                    "online_url": f"https://example.org/ext_{i_repo}",
+                }
+                for i_repo in range(subrepo)
+            ],
+        }
+        group[f"nested_{i_group}"] = copy.deepcopy(group)
+        content[f"group_{i_group}"] = group
+    return {"subrepo": content}
+
+
+def list_paths(content, path: tuple = ()) -> list:
+    """List paths to every value of a document.
+
+    Arguments:
+        content: Document or part of a document,
+        path: Path to `content` (used for recursion).
+
+    Returns:
+        List of tuples of keys and indexes, from the root of the document.
+    """
+    paths = [path]
+    if isinstance(content, dict):
+        items = content.items()
+    elif isinstance(content, list):
+        items = enumerate(content)
+    else:
+        items = []
+    for i_key, i_value in items:
+        paths += list_paths(i_value, path + (i_key,))
+    return paths
+
+
+def mutate(content) -> list:
+    """Build every single mutation of a document.
+
+    A mutation replaces a value by one of `SCHEMA_SAMPLES`, removes a key or
+    an item, adds one of `SCHEMA_UNKNOWN_KEYS` to a mapping or an item to a
+    sequence.
+
+    Arguments:
+        content: Valid document.
+
+    Returns:
+        List of mutated documents.
+    """
+    mutations = []
+    for i_path in list_paths(content):
+        parent_path, key = i_path[:-1], i_path[-1:]
+        for i_sample in SCHEMA_SAMPLES:
+            mutated = copy.deepcopy(content)
+            if not key:
+                mutations.append(copy.deepcopy(i_sample))
+                continue
+            parent = mutated
+            for i_key in parent_path:
+                parent = parent[i_key]
+            parent[key[0]] = copy.deepcopy(i_sample)
+            mutations.append(mutated)
+        value = content
+        for i_key in i_path:
+            value = value[i_key]
+        if key:
+            mutated = copy.deepcopy(content)
+            parent = mutated
+            for i_key in parent_path:
+                parent = parent[i_key]
+            del parent[key[0]]
+            mutations.append(mutated)
+        if isinstance(value, list) and value:
+            mutated = copy.deepcopy(content)
+            parent = mutated
+            for i_key in i_path:
+                parent = parent[i_key]
+            parent.append(copy.deepcopy(value[0]))
+            mutations.append(mutated)
+        if isinstance(value, dict):
+            for i_key in SCHEMA_UNKNOWN_KEYS:
+                mutated = copy.deepcopy(content)
+                parent = mutated
+                for j_key in i_path:
+                    parent = parent[j_key]
+                parent.setdefault(i_key, "text")
+                mutations.append(mutated)
+    return mutations
+
+
+def get_schema_cases() -> dict:
+    """Return schemas checked by scenario `schema` and their valid documents.
+
+    Returns:
+        Dictionary which keys are names of cases and values are tuples of the
+        path of the schema, or None for `SCHEMA_FEATURES`, and of the list of
+        documents valid against it.
+    """
+    schema_dir = os.path.join(PLUGINS_PATH, "schema")
+    data_dir = os.path.join(MKDOCS_ROOT, "docs", "_data")
+    cases = {
+        "vars": (
+            os.path.join(schema_dir, "vars.schema.yaml"),
+            [
+                load_yml(os.path.join(data_dir, "vars.yaml")),
+                load_yml(
+                    os.path.join(PLUGINS_PATH, "template", "vars.tpl.yaml")
+                ),
+            ],
+        ),
+        "repo": (
+            os.path.join(schema_dir, "repo.schema.yaml"),
+            [load_yml(os.path.join(data_dir, "mkdocs_template.yaml"))],
+        ),
+        "subrepo": (
+            os.path.join(schema_dir, "subrepo.schema.yaml"),
+            [generate_subrepo(2, 1)],
+        ),
+        "features": (None, [SCHEMA_FEATURES_DOC]),
+    }
+    # Fill optional keys of vars commented in the template
+    cases["vars"][1][1].update(
+        {
+            "site_name": "Site",
+            "site_url": "https://example.org",
+            "theme": {
+                "name": "material",
+                "search_index_only": True,
+                "features": ["navigation.tabs"],
+                "palette": {"scheme": "slate"},
+                "font": {"text": "Roboto"},
+                "icon": {"repo": "gitlab"},
+            },
+            "subrepo_config": {"jobs": 2, "checkout": "sparse", "lock": True},
+        }
+    )
+    return cases
+
+
+def generate_repo_file(data_dir: str, index: int) -> str:
+    """Write a valid repo file in a `_data` folder.
+
+    Arguments:
+        data_dir: Path of the `_data` folder,
+        index: Index of the repo, used in its name.
+
+    Returns:
+        Name of the written file.
+    """
+    content = {
+        f"repo_{index}": {
+            "name": f"Repo {index}",
+            "desc": " ".join(["Description of the repo."] * 10),
+            "git_slug_with_namespace": f"namespace/repo_{index}",
+            "git_name_with_namespace": f"Namespace / Repo {index}",
+            "logo": "assets/img/meta/logo.png",
+            "src_path": [f"src/module_{i_src}" for i_src in range(5)],
+            "maintainers": [
+                {"name": f"Maintainer {i_user}", "mail": f"m{i_user}@x.org"}
+                for i_user in range(5)
+            ],
+        }
+    }
+    filename = f"repo_{index}.yaml"
+    with open(os.path.join(data_dir, filename), "w", encoding="UTF-8") as file:
+        file.write("# Repo information\n")
+        yaml.dump(content, file, default_flow_style=False)
+    return filename
+
+
+def generate_tags(repo_dir: str, nb_tags: int) -> None:
+    """Create a git repo with a commit and `nb_tags` version tags.
+
+    Tags are created with a single `git update-ref --stdin`, such that
+    generating tens of thousands of them takes a few seconds.
+
+    Arguments:
+        repo_dir: Path of the git repo to create,
+        nb_tags: Number of tags to create.
+    """
+    env = dict(os.environ, **GIT_IDENTITY)
+    subprocess.run(["git", "init", "-q", repo_dir], check=True, env=env)
+    subprocess.run(
+        ["git", "-C", repo_dir, "commit", "-q", "--allow-empty", "-m", "init"],
+        check=True,
+        env=env,
+    )
+    commands = []
+    for i_tag in range(nb_tags):
+        major, minor, patch = i_tag // 1000, i_tag // 20 % 50, i_tag % 20
+        suffix = "-rc.1" if i_tag % 7 == 0 else ""
+        commands.append(
+            f"create refs/tags/v{major}.{minor}.{patch}{suffix} HEAD\n"
+        )
+    subprocess.run(
+        ["git", "-C", repo_dir, "update-ref", "--stdin"],
+        input="".join(commands),
+        text=True,
+        check=True,
+        env=env,
+    )
+    subprocess.run(
+        ["git", "-C", repo_dir, "pack-refs", "--all"], check=True, env=env
+    )
+
+
+def git_commit_all(repo_dir: str) -> None:
+    """Commit every file of a git repo, creating the repo if needed.
+
+    Arguments:
+        repo_dir: Path of the git repo.
+    """
+    env = dict(os.environ, **GIT_IDENTITY)
+    if not os.path.isdir(os.path.join(repo_dir, ".git")):
+        subprocess.run(["git", "init", "-q", repo_dir], check=True, env=env)
+    subprocess.run(["git", "-C", repo_dir, "add", "-A"], check=True, env=env)
+    subprocess.run(
+        ["git", "-C", repo_dir, "commit", "-q", "-m", "Generated"],
+        check=True,
+        env=env,
+    )
+
+
+def generate_remote(workspace: str, index: int) -> str:
+    """Create a local bare repo acting as the remote of a subrepo.
+
+    Arguments:
+        workspace: Path of the generated workspace,
+        index: Index of the subrepo, used in its name.
+
+    Returns:
+        URL of the bare repo.
+    """
+    source_dir = os.path.join(workspace, "sources", f"repo_{index}")
+    data_dir = os.path.join(source_dir, "docs", "_data")
+    shutil.copytree(
+        os.path.join(PLUGINS_PATH, "schema"), os.path.join(data_dir, "schema")
+    )
+    generate_repo_file(data_dir, index)
+    with open(
+        os.path.join(source_dir, "docs", "index.md"), "w", encoding="UTF-8"
+    ) as file:
+        file.write(f"# Repo {index}\n")
+    with open(
+        os.path.join(source_dir, "mkdocs.yml"), "w", encoding="UTF-8"
+    ) as file:
+        file.write(f"site_name: Repo {index}\n")
+    git_commit_all(source_dir)
+    remote_dir = os.path.join(workspace, "remotes", f"repo_{index}.git")
+    subprocess.run(
+        ["git", "clone", "-q", "--bare", source_dir, remote_dir], check=True
+    )
+    return f"file://{remote_dir}"
+
+
+def generate_subrepo_tree(remotes: list, depth: int, width: int) -> dict:
+    """Generate a `subrepo.yaml` spreading subrepo over nested groups.
+
+    Groups are nested on `depth` levels, with `width` groups per level, and
+    subrepo are spread over the groups of the last level, alternatively as
+    internal and external subrepo.
+
+    Arguments:
+        remotes: URL of the remote of each subrepo,
+        depth: Number of levels of groups,
+        width: Number of groups per level.
+
+    Returns:
+        Content of the generated `subrepo.yaml`.
+    """
+    leaves = [{}]
+    tree = leaves[0]
+    for i_level in range(depth):
+        next_leaves = []
+        for i_leaf in leaves:
+            for i_group in range(width):
+                group = {"nav_entry": f"Group {i_level}.{i_group}"}
+                i_leaf[f"group_{i_level}_{i_group}"] = group
+                next_leaves.append(group)
+        leaves = next_leaves
+    for i_index, i_url in enumerate(remotes):
+        repo = {
+            "name": f"repo_{i_index}",
+            "git_url": i_url,
+            "nav_entry": f"Repo {i_index}",
+        }
+        if i_index % 2:
+            repo["online_url"] = f"https://example.org/repo_{i_index}"
+            kind = "external"
+        else:
+            kind = "internal"
+        leaves[i_index % len(leaves)].setdefault(kind, []).append(repo)
+    for i_leaf in leaves:
+        # Lists following an `external` list are handled as external too
+        if "external" in i_leaf:
+            i_leaf["external"] = i_leaf.pop("external")
+    return {"subrepo": tree}
+
+
+def generate_workspace(workspace: str, args: argparse.Namespace) -> str:
+    """Generate subrepo remotes and the repo holding the documentation.
+
+    Arguments:
+        workspace: Path of the folder where to generate the workspace,
+        args: Parsed command line arguments.
+
+    Returns:
+        Path of the repo holding the documentation.
+    """
+    remotes = [
+        generate_remote(workspace, i_repo) for i_repo in range(args.repos)
+    ]
+
+    project_dir = os.path.join(workspace, "project")
+    generate_tags(project_dir, args.tags)
+    data_dir = os.path.join(project_dir, "docs", "_data")
+    shutil.copytree(
+        os.path.join(PLUGINS_PATH, "schema"), os.path.join(data_dir, "schema")
+    )
+    os.rename(
+        os.path.join(data_dir, generate_repo_file(data_dir, 0)),
+        os.path.join(data_dir, "project.yaml"),
+    )
+    with open(
+        os.path.join(data_dir, "project.yaml"), "r+", encoding="UTF-8"
+    ) as file:
+        content = file.read().replace("repo_0:", "project:")
+        file.seek(0)
+        file.write(content)
+
+    with open(
+        os.path.join(PLUGINS_PATH, "template", "vars.tpl.yaml"),
+        encoding="UTF-8",
+    ) as file:
+        variables = yaml.safe_load(file)
+    variables.update(
+        {
+            "copyright": "Benchmark",
+            "theme": {
+                "name": "material",
+                "features": [f"feature.{i_key}" for i_key in range(args.keys)],
+            },
+            "subrepo_config": {"jobs": args.jobs},
+        }
+    )
+    extra = {
+        f"extra_{i_key}": {
+            "name": f"Extra {i_key}",
+            "values": [f"value {i_value}" for i_value in range(10)],
+        }
+        for i_key in range(args.keys)
+    }
+    subrepo = generate_subrepo_tree(remotes, args.depth, args.width)
+    for i_name, i_content in (
+        ("vars.yaml", variables),
+        ("extra.yaml", extra),
+        ("subrepo.yaml", subrepo),
+    ):
+        with open(
+            os.path.join(data_dir, i_name), "w", encoding="UTF-8"
+        ) as file:
+            yaml.dump(
+                i_content, file, default_flow_style=False, sort_keys=False
+            )
+    with open(
+        os.path.join(project_dir, ".gitignore"), "w", encoding="UTF-8"
+    ) as file:
+        file.write("".join(f"/{i_group}/\n" for i_group in subrepo["subrepo"]))
+    git_commit_all(project_dir)
+    return project_dir
+
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------
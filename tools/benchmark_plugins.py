@@ -0,0 +1,976 @@
+#!/usr/bin/env python3
+"""Benchmark methods of `templates/docs/_data/plugins.py`.
+
+SYNOPSIS:
+  `./benchmark_plugins.py [-h] SCENARIO [options]`
+
+DESCRIPTION:
+  Generate synthetic inputs for a scenario, run the corresponding methods of
+  `templates/docs/_data/plugins.py` on it and print the time spent. Every
+  scenario runs fully offline.
+
+  Available scenarios are:
+
+  - `nav`: Build the `nav` key for a generated `nav` holding thousands of
+    entries and a generated `subrepo.yaml`.
+  - `schema`: Check compiled schema validators accept and reject exactly the
+    same documents as pykwalify, for every schema in `docs/_data/schema` and a
+    schema using every supported keyword, on valid documents and all their
+    single mutations, then time both validators. Exit with an error if they
+    disagree. `test/test_plugins_schema.py` runs the same check with pytest.
+  - `load`: Load a generated `_data` folder holding hundreds of repo files,
+    with pykwalify as before compiled validators, with the pure Python and
+    the libyaml YAML loaders, and with `load_yaml_file` with an empty and a
+    filled data files cache.
+  - `tags`: Build `versions.json` content for a generated git repo holding
+    thousands of tags.
+  - `define_env`: Run `define_env` end to end on a generated workspace, i.e.
+    local bare repos acting as subrepo, a nested `subrepo.yaml`, a repo
+    holding many tags and large `vars.yaml` and `extra.yaml`. Report the wall
+    time, the peak RSS and the number of git processes of a build cloning
+    subrepo, of a build pulling them, of a build using the configuration
+    snapshot, of a `mkdocs serve` reload, of a build cloning subrepo from
+    mirrors and locking them and of a build cloning locked subrepo from
+    mirrors already holding their commit. Each build runs in its own process,
+    such that its peak RSS is not polluted by the previous ones. Exit with an
+    error if a build ends with variables or a configuration differing from the
+    first build with the same options.
+  - `importtime`: Measure the import time of `plugins.py` with
+    `python -X importtime` in new processes, check heavy dependencies are not
+    imported with it and measure the import time of each of them, deferred to
+    their first use.
+  - `to_html`: Render the description of hundreds of repos with macro
+    `to_html`, as on pages listing subrepo, with `markdown.markdown` as before
+    and with `get_markdown_converter`, with and without markdown extensions.
+"""
+
+# Parser for command-line options
+# https://docs.python.org/3/library/argparse.html
+import argparse
+
+# Silence the output of the plugin during builds
+# https://docs.python.org/3/library/contextlib.html
+import contextlib
+
+# Deep copy of mutated documents
+# https://docs.python.org/3/library/copy.html
+import copy
+
+# Date of the stub git variable
+# https://docs.python.org/3/library/datetime.html
+import datetime
+
+# Bind arguments of timed functions
+# https://docs.python.org/3/library/functools.html
+import functools
+
+# Import the plugin module from its path
+# https://docs.python.org/3/library/importlib.html
+import importlib.util
+
+# Read and print results of builds
+# https://docs.python.org/3/library/json.html
+import json
+
+# Logging facility, to silence pykwalify errors
+# https://docs.python.org/3/library/logging.html
+import logging
+
+# Miscellaneous operating system interfaces
+# https://docs.python.org/3/library/os.html
+import os
+
+# Peak resident memory of builds
+# https://docs.python.org/3/library/resource.html
+import resource
+
+# Copy schema files
+# https://docs.python.org/3/library/shutil.html
+import shutil
+
+# Run git commands on generated repos
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+
+# System-specific parameters and functions
+# https://docs.python.org/3/library/sys.html
+import sys
+
+# Temporary folders for generated files
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+
+# Measure execution time
+# https://docs.python.org/3/library/time.html
+import time
+
+# Stub of the mkdocstrings plugin
+# https://docs.python.org/3/library/types.html
+import types
+
+# Python Git Library
+# https://pypi.org/project/GitPython/
+import git
+
+# Python implementation of Markdown
+# https://pypi.org/project/markdown/
+import markdown
+
+# YAML parser and emitter for Python
+# https://pypi.org/project/PyYAML/
+import yaml
+
+# Generate synthetic inputs of scenarios
+# tools/benchmark_fixtures.py
+from benchmark_fixtures import (
+    GIT_IDENTITY,
+    PLUGINS_PATH,
+    SCHEMA_FEATURES,
+    generate_nav,
+    generate_repo_file,
+    generate_subrepo,
+    generate_tags,
+    generate_workspace,
+    get_schema_cases,
+    load_yml,
+    mutate,
+)
+
+# Python lib/cli for JSON/YAML schema validation
+# https://pypi.org/project/pykwalify/
+from pykwalify.core import Core as yamlschema
+
+# pylint: disable=W0105
+# - W0105: String statement has no effect
+
+GIT_WRAPPER = """#!/bin/sh
+echo "$1" >> "{log}"
+exec "{git}" "$@"
+"""
+"""Git executable used by builds, logging each git process it starts."""
+
+
+BUILDS = {
+    "clone": "Clone every subrepo, with empty caches",
+    "pull": "Pull every subrepo, with empty caches",
+    "snapshot": "Pull every subrepo, then use the previous snapshot",
+    "reload": "Second build of the same process, as on mkdocs serve reload",
+    "mirror": "Clone every subrepo from mirrors and lock them, empty caches",
+    "locked": "Clone every locked subrepo from mirrors holding their commit",
+}
+"""Builds timed by scenario `define_env`, in the order they are run."""
+
+
+MIRROR_BUILDS = ("mirror", "locked")
+"""Builds with options `mirror` and `lock` of `subrepo_config` enabled."""
+
+
+LAZY_MODULES = ("git", "markdown", "yaml", "pykwalify.core")
+"""Heavy dependencies `plugins.py` imports on first use only."""
+
+
+class StubEnv:
+    """Minimal replacement of the mkdocs-macros-plugin environment.
+
+    Attributes:
+        project_dir: Root of the documentation,
+        variables: Variables usable in jinja templates,
+        conf: Mkdocs configuration.
+    """
+
+    def __init__(self, project_dir: str, nav: list = None) -> None:
+        """Initialize an empty environment.
+
+        Arguments:
+            project_dir: Root of the documentation,
+            nav: Value of the `nav` key of the mkdocs configuration.
+        """
+        self.project_dir = project_dir
+        # As mkdocs-macros-plugin, variable `git` holds non JSON values
+        self.variables = {"git": {"date": datetime.datetime(2021, 1, 1)}}
+        self.conf = {"nav": nav or []}
+
+    def fill_conf(self) -> None:
+        """Fill the mkdocs configuration as `mkdocs.yml` of this repo does."""
+        self.conf.update(
+            {
+                "site_name": "",
+                "plugins": {
+                    "monorepo": object(),
+                    "mkdocstrings": types.SimpleNamespace(
+                        config=types.SimpleNamespace(
+                            data={
+                                "handlers": {
+                                    "python": {"setup_commands": ["import sys"]}
+                                }
+                            }
+                        )
+                    ),
+                },
+                "theme": {"icon": None},
+                "site_dir": os.path.join(self.project_dir, "site"),
+                "config_file_path": os.path.join(
+                    self.project_dir, "mkdocs.yml"
+                ),
+            }
+        )
+        self.variables["version"] = {"provider": "mike"}
+
+    def macro(self, method):
+        """Register a macro, as mkdocs-macros-plugin does.
+
+        Arguments:
+            method: Method defining the macro.
+
+        Returns:
+            The method.
+        """
+        return method
+
+
+def load_plugins(name: str = "plugins"):
+    """Import `plugins.py` from the `templates` folder.
+
+    `plugins.py` imports its modules, e.g. `plugins_schema`, which are then
+    registered in `sys.modules`.
+
+    Arguments:
+        name: Name of the module to return, `plugins` or one of its modules.
+
+    Returns:
+        The imported module.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "plugins", os.path.join(PLUGINS_PATH, "plugins.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["plugins"] = module
+    spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def best_of(func, repeat: int) -> float:
+    """Call `func` `repeat` times and return the shortest duration.
+
+    Arguments:
+        func: Method without arguments to time,
+        repeat: Number of calls.
+
+    Returns:
+        The shortest duration in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def report(scenario: str, results: dict) -> None:
+    """Print results of a scenario.
+
+    Arguments:
+        scenario: Name of the scenario,
+        results: Dictionary which keys are measure names and values their
+            value.
+    """
+    print(f"[{scenario}]")
+    for i_key, i_value in results.items():
+        if isinstance(i_value, float):
+            i_value = f"{i_value * 1000:.3f} ms"
+        print(f"  {i_key:<32} {i_value}")
+
+
+def bench_nav(args: argparse.Namespace) -> None:
+    """Benchmark [update_nav][plugins_nav.update_nav] on a generated `nav`.
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    plugins_nav = load_plugins("plugins_nav")
+    subrepo = {}
+    for i_group in range(args.groups):
+        subrepo[f"group_{i_group}"] = {
+            # Half of the groups target existing nested entries
+            "nav_entry": f"Entry {i_group}"
+            if i_group % 2
+            else f"Group {i_group}",
+            "internal": [
+                {"name": f"repo_{i_repo}", "nav_entry": f"Repo {i_repo}"}
+                for i_repo in range(args.subrepo // args.groups)
+            ],
+        }
+
+    nav = generate_nav(args.width, args.depth)
+    nb_entries = len(yaml.dump(nav).splitlines())
+
+    def run():
+        env = StubEnv("/tmp/project", generate_nav(args.width, args.depth))
+        plugins_nav.update_nav(env, subrepo, first_iteration=True)
+
+    def generate():
+        generate_nav(args.width, args.depth)
+
+    def legacy_lookup():
+        # Substring lookup done for every subrepo before the nav index
+        _ = "Entry 0" in yaml.dump(nav)
+
+    duration = best_of(run, args.repeat) - best_of(generate, args.repeat)
+    results = {
+        "nav entries": nb_entries,
+        "subrepo": args.subrepo,
+        "update_nav": duration,
+    }
+    if args.legacy:
+        # Extrapolated from a single lookup, doing all of them takes minutes
+        results["legacy yaml.dump lookups"] = args.subrepo * best_of(
+            legacy_lookup, 1
+        )
+    report("nav", results)
+
+
+def pykwalify_accepts(content, schema: dict) -> bool:
+    """Tell if pykwalify accepts a document.
+
+    Arguments:
+        content: Document to validate,
+        schema: Content of the schema.
+
+    Returns:
+        True if pykwalify reports no error and raises no exception.
+    """
+    try:
+        core = yamlschema(
+            source_data=copy.deepcopy(content),
+            schema_data=copy.deepcopy(schema),
+        )
+        core.validate(raise_exception=False)
+    # pylint: disable=W0703
+    # - W0703: Catching too general exception
+    except Exception:
+        return False
+    return not core.errors
+
+
+def check_schema_case(
+    plugins_schema, name: str, schema_file: str, contents: list, results: dict
+) -> list:
+    """Compare compiled validator and pykwalify on documents of a schema.
+
+    Exit with an error if the schema can not be compiled or if a document
+    expected to be valid is not.
+
+    Arguments:
+        plugins_schema: The `plugins_schema.py` module,
+        name: Name of the case,
+        schema_file: Path of the schema, or None for `SCHEMA_FEATURES`,
+        contents: Valid documents, checked with all their single mutations,
+        results: Results of the scenario, updated with counts of documents.
+
+    Returns:
+        List of tuples `(name, accepted by pykwalify, document)` of documents
+        on which the compiled validator and pykwalify disagree.
+    """
+    schema = load_yml(schema_file) if schema_file else SCHEMA_FEATURES
+    validator = plugins_schema.compile_schema(copy.deepcopy(schema))
+    if validator is None:
+        print(f"Schema {name} can not be compiled")
+        sys.exit(1)
+    documents = []
+    for i_content in contents:
+        if not pykwalify_accepts(i_content, schema):
+            print(f"Document of {name} is not valid")
+            sys.exit(1)
+        documents += [i_content] + mutate(i_content)
+    mismatches = []
+    accepted = 0
+    for i_document in documents:
+        expected = pykwalify_accepts(i_document, schema)
+        actual = i_document is not None and validator(i_document)
+        accepted += expected
+        if expected != actual:
+            mismatches.append((name, expected, i_document))
+    results[f"{name} documents"] = len(documents)
+    results[f"{name} accepted by pykwalify"] = accepted
+    return mismatches
+
+
+def time_schema_validators(
+    plugins_schema, cases: dict, args: argparse.Namespace
+) -> dict:
+    """Time pykwalify and compiled validators on vars and large subrepo files.
+
+    Arguments:
+        plugins_schema: The `plugins_schema.py` module,
+        cases: Cases returned by `get_schema_cases`,
+        args: Parsed command line arguments.
+
+    Returns:
+        Dictionary of timings, by validator.
+    """
+    vars_schema, (vars_content, _) = cases["vars"]
+    subrepo_schema, _ = cases["subrepo"]
+    subrepo_content = generate_subrepo(args.groups, args.subrepo)
+    results = {}
+    for i_name, i_schema_file, i_content in (
+        ("vars", vars_schema, vars_content),
+        ("subrepo", subrepo_schema, subrepo_content),
+    ):
+        validator = plugins_schema.get_schema_validator(i_schema_file)
+        results[f"{i_name} pykwalify"] = best_of(
+            lambda content=i_content, schema_file=i_schema_file: yamlschema(
+                source_data=content, schema_files=[schema_file]
+            ).validate(),
+            args.repeat,
+        )
+        results[f"{i_name} compiled"] = best_of(
+            functools.partial(validator, i_content), args.repeat
+        )
+    return results
+
+
+def bench_schema(args: argparse.Namespace) -> None:
+    """Check and benchmark [compile_schema][plugins_schema.compile_schema].
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    plugins_schema = load_plugins("plugins_schema")
+    logging.getLogger("pykwalify").setLevel(logging.CRITICAL)
+    cases = get_schema_cases()
+    results = {}
+    mismatches = []
+    for i_name, (i_schema_file, i_contents) in cases.items():
+        mismatches += check_schema_case(
+            plugins_schema, i_name, i_schema_file, i_contents, results
+        )
+    results.update(time_schema_validators(plugins_schema, cases, args))
+    results["mismatches"] = len(mismatches)
+    report("schema", results)
+
+    for i_name, i_expected, i_document in mismatches[:10]:
+        verdict = "accepts" if i_expected else "rejects"
+        print(f"pykwalify {verdict} {i_name} document: {i_document}")
+    if mismatches:
+        sys.exit(1)
+
+
+def bench_load(args: argparse.Namespace) -> None:
+    """Benchmark [load_yaml_file][plugins_schema.load_yaml_file] on many files.
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    plugins_schema = load_plugins("plugins_schema")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, "_data")
+        shutil.copytree(
+            os.path.join(PLUGINS_PATH, "schema"),
+            os.path.join(data_dir, "schema"),
+        )
+        filenames = [
+            generate_repo_file(data_dir, i_file) for i_file in range(args.files)
+        ]
+        schema_file = os.path.join(data_dir, "schema", "repo.schema.yaml")
+        validator = plugins_schema.get_schema_validator(schema_file)
+
+        def legacy():
+            for i_file in filenames:
+                yamlschema(
+                    source_file=os.path.join(data_dir, i_file),
+                    schema_files=[schema_file],
+                ).validate()
+
+        def loader(yaml_loader):
+            def run():
+                for i_file in filenames:
+                    path = os.path.join(data_dir, i_file)
+                    with open(path, encoding="UTF-8") as file:
+                        validator(yaml.load(file, Loader=yaml_loader))
+
+            return run
+
+        def load_yaml_file(cache_dir):
+            def run():
+                plugins_schema.CACHE_DIR = cache_dir or tempfile.mkdtemp(
+                    dir=tmp_dir
+                )
+                for i_file in filenames:
+                    plugins_schema.load_yaml_file(data_dir, i_file)
+
+            return run
+
+        results = {
+            "files": args.files,
+            "libyaml": yaml.__with_libyaml__,
+            "pykwalify Core": best_of(legacy, args.repeat),
+            "SafeLoader + compiled": best_of(
+                loader(yaml.SafeLoader), args.repeat
+            ),
+        }
+        if yaml.__with_libyaml__:
+            results["CSafeLoader + compiled"] = best_of(
+                loader(yaml.CSafeLoader), args.repeat
+            )
+        results["load_yaml_file, empty cache"] = best_of(
+            load_yaml_file(None), args.repeat
+        )
+        warm_cache = os.path.join(tmp_dir, "warm")
+        load_yaml_file(warm_cache)()
+        results["load_yaml_file, filled cache"] = best_of(
+            load_yaml_file(warm_cache), args.repeat
+        )
+    report("load", results)
+
+
+def bench_tags(args: argparse.Namespace) -> None:
+    """Benchmark [build_mike_versions][plugins_versions.build_mike_versions].
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    plugins_versions = load_plugins("plugins_versions")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generate_tags(tmp_dir, args.tags)
+        git_repo = git.Repo(tmp_dir)
+
+        def run():
+            plugins_versions.build_mike_versions(
+                plugins_versions.get_tag_names(git_repo)
+            )
+
+        def legacy_lookup():
+            # Tag enumeration and dump done before the single git command
+            for i_tag in git_repo.tags:
+                yaml.dump(i_tag.path)
+
+        versions = plugins_versions.build_mike_versions(
+            plugins_versions.get_tag_names(git_repo)
+        )
+        results = {
+            "tags": args.tags,
+            "versions": len(versions),
+            "latest": versions[0]["title"],
+            "list and parse tags": best_of(run, args.repeat),
+        }
+        if args.legacy:
+            results["legacy tags and yaml.dump"] = best_of(legacy_lookup, 1)
+    report("tags", results)
+
+
+def count_git_children() -> int:
+    """Count git processes started by this process which are still running.
+
+    Returns:
+        Number of running git child processes, or -1 without `/proc`.
+    """
+    if not os.path.isdir("/proc"):
+        return -1
+    count = 0
+    for i_pid in os.listdir("/proc"):
+        try:
+            with open(f"/proc/{i_pid}/stat", encoding="UTF-8") as file:
+                stat = file.read()
+        except (OSError, ValueError):
+            continue
+        # Command name is in parentheses and may hold spaces
+        name, fields = stat.split("(", 1)[1].rsplit(")", 1)
+        if name.startswith("git") and int(fields.split()[1]) == os.getpid():
+            count += 1
+    return count
+
+
+def dump_env(env: StubEnv) -> str:
+    """Serialize variables and configuration of an environment.
+
+    Arguments:
+        env: Environment, after `define_env`.
+
+    Returns:
+        JSON of variables and configuration, objects other than JSON values
+        being replaced by their attributes or by their type name.
+    """
+    return json.dumps(
+        {"variables": env.variables, "conf": env.conf},
+        sort_keys=True,
+        default=lambda value: getattr(value, "__dict__", type(value).__name__),
+    )
+
+
+def run_build(args: argparse.Namespace) -> None:
+    """Run `define_env` in this process and print measures as JSON.
+
+    Only the last of `args.runs` builds is measured. Each build is ended by
+    `on_post_build`, as done by mkdocs once the site is built.
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    os.chdir(args.run)
+    plugins = load_plugins()
+    git_log = os.environ["BENCHMARK_GIT_LOG"]
+    for i_run in range(args.runs):
+        env = StubEnv(args.run, [{"Home": "index.md"}])
+        env.fill_conf()
+        with open(git_log, "w", encoding="UTF-8"):
+            pass
+        start = time.perf_counter()
+        with open(os.devnull, "w", encoding="UTF-8") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                plugins.define_env(env)
+        duration = time.perf_counter() - start
+        # End the build as mkdocs does, which closes git repos
+        with open(os.devnull, "w", encoding="UTF-8") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                plugins.on_post_build(env)
+        if i_run == args.runs - 1:
+            with open(git_log, encoding="UTF-8") as file:
+                git_spawned = len(file.readlines())
+            print(
+                json.dumps(
+                    {
+                        "wall time": duration,
+                        # Kilobytes on Linux, bytes on macOS
+                        "peak RSS (KiB)": resource.getrusage(
+                            resource.RUSAGE_SELF
+                        ).ru_maxrss,
+                        "git processes started": git_spawned,
+                        "git processes left": count_git_children(),
+                        "env": dump_env(env),
+                    }
+                )
+            )
+
+
+def prepare_build(build: str, project_dir: str, cache_dir: str) -> None:
+    """Reset caches, subrepo and options as expected by a build.
+
+    Arguments:
+        build: Name of the build, see `BUILDS`,
+        project_dir: Path of the repo holding the documentation,
+        cache_dir: Path of the cache folder of builds.
+    """
+    if build in ("clone", "pull", "mirror"):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if build in ("clone", "mirror", "locked"):
+        # Keep the lock file written by build mirror
+        subprocess.run(
+            [
+                "git",
+                "-C",
+                project_dir,
+                "clean",
+                "-ffdxq",
+                "-e",
+                "/docs/_data/subrepo.lock",
+            ],
+            check=True,
+        )
+    if build == "mirror":
+        vars_file = os.path.join(project_dir, "docs", "_data", "vars.yaml")
+        with open(vars_file, encoding="UTF-8") as file:
+            variables = yaml.safe_load(file)
+        variables["subrepo_config"].update({"mirror": True, "lock": True})
+        with open(vars_file, "w", encoding="UTF-8") as file:
+            yaml.dump(
+                variables, file, default_flow_style=False, sort_keys=False
+            )
+
+
+def get_build_environ(workspace: str) -> dict:
+    """Write the git wrapper and return the environment of builds.
+
+    Arguments:
+        workspace: Path of the generated workspace.
+
+    Returns:
+        Environment variables of builds, with their own cache folder and the
+        git executable logging git processes.
+    """
+    git_log = os.path.join(workspace, "git.log")
+    git_wrapper = os.path.join(workspace, "git")
+    with open(git_wrapper, "w", encoding="UTF-8") as file:
+        file.write(GIT_WRAPPER.format(log=git_log, git=shutil.which("git")))
+    os.chmod(git_wrapper, 0o755)
+    return dict(
+        os.environ,
+        XDG_CACHE_HOME=os.path.join(workspace, "cache"),
+        GIT_PYTHON_GIT_EXECUTABLE=git_wrapper,
+        BENCHMARK_GIT_LOG=git_log,
+        **GIT_IDENTITY,
+    )
+
+
+def bench_define_env(args: argparse.Namespace) -> None:
+    """Benchmark [define_env][plugins.define_env] on a generated workspace.
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    if args.run:
+        run_build(args)
+        return
+
+    with tempfile.TemporaryDirectory() as workspace:
+        start = time.perf_counter()
+        project_dir = generate_workspace(workspace, args)
+        results = {
+            "subrepo": args.repos,
+            "groups depth x width": f"{args.depth} x {args.width}",
+            "tags": args.tags,
+            "vars and extra keys": args.keys,
+            "workspace generation": time.perf_counter() - start,
+        }
+
+        env = get_build_environ(workspace)
+        envs = {}
+        for i_build in BUILDS:
+            prepare_build(i_build, project_dir, env["XDG_CACHE_HOME"])
+            build = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "define_env",
+                    "--run",
+                    project_dir,
+                    "--runs",
+                    "2" if i_build == "reload" else "1",
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+            if build.returncode:
+                print(build.stdout, build.stderr, sep="\n")
+                sys.exit(build.returncode)
+            measures = json.loads(build.stdout.splitlines()[-1])
+            envs[i_build] = measures.pop("env")
+            for i_measure, i_value in measures.items():
+                results[f"{i_build} {i_measure}"] = i_value
+    report("define_env", results)
+    for i_build, i_desc in BUILDS.items():
+        print(f"  {i_build + ':':<32} {i_desc}")
+    differing = [
+        i_build
+        for i_build, i_env in envs.items()
+        if i_env != envs["mirror" if i_build in MIRROR_BUILDS else "clone"]
+    ]
+    if differing:
+        print(
+            "Variables or configuration differ from build clone, or mirror: "
+            + ", ".join(differing)
+        )
+        sys.exit(1)
+
+
+def import_time(statement: str) -> dict:
+    """Run an import statement in a new process with `-X importtime`.
+
+    Arguments:
+        statement: Python statements importing modules.
+
+    Returns:
+        Dictionary which keys are names of imported modules and values are
+        their cumulative import time in seconds.
+    """
+    run = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    durations = {}
+    for i_line in run.stderr.splitlines():
+        # Lines are "import time: <self us> | <cumulative us> | <module>"
+        if not i_line.startswith("import time:") or "[us]" in i_line:
+            continue
+        _, cumulative, module = i_line.split("|")
+        durations[module.strip()] = int(cumulative) / 1e6
+    return durations
+
+
+def bench_importtime(args: argparse.Namespace) -> None:
+    """Benchmark the import time of `plugins.py` and its dependencies.
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    statement = (
+        f"import sys; sys.path.insert(0, {PLUGINS_PATH!r}); import plugins"
+    )
+    runs = [import_time(statement) for _ in range(args.repeat)]
+    eager = sorted(
+        i_module
+        for i_module in LAZY_MODULES
+        if i_module in runs[0] or i_module.split(".", maxsplit=1)[0] in runs[0]
+    )
+    results = {
+        "plugins": min(i_run["plugins"] for i_run in runs),
+        "modules imported": len(runs[0]),
+        "heavy modules imported": ", ".join(eager) or "none",
+    }
+    for i_module in LAZY_MODULES:
+        results[f"{i_module} (on first use)"] = min(
+            import_time(f"import {i_module}")[i_module]
+            for _ in range(args.repeat)
+        )
+    report("importtime", results)
+    if eager:
+        sys.exit(1)
+
+
+def bench_to_html(args: argparse.Namespace) -> None:
+    """Benchmark [get_markdown_converter][plugins.get_markdown_converter].
+
+    Arguments:
+        args: Parsed command line arguments.
+    """
+    plugins = load_plugins()
+    descriptions = [
+        f"Repo **{i_repo}** holding [roles](https://example.org/{i_repo}) "
+        "and `programs`, see the documentation for details."
+        for i_repo in range(args.repos)
+    ]
+    extensions = ["abbr", "attr_list", "def_list", "tables", "toc"]
+
+    def legacy():
+        for _ in range(args.pages):
+            for i_desc in descriptions:
+                markdown.markdown(i_desc)
+
+    def converter(*converter_args):
+        def run():
+            to_html = plugins.get_markdown_converter(*converter_args)
+            for _ in range(args.pages):
+                for i_desc in descriptions:
+                    to_html(i_desc)
+
+        return run
+
+    results = {
+        "descriptions": args.repos,
+        "pages": args.pages,
+        "markdown.markdown": best_of(legacy, args.repeat),
+        "cached converter": best_of(converter(), args.repeat),
+        "cached converter, extensions": best_of(
+            converter(extensions), args.repeat
+        ),
+    }
+    report("to_html", results)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Returns:
+        Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark methods of templates/docs/_data/plugins.py"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of runs per measure"
+    )
+    scenarios = parser.add_subparsers(dest="scenario", required=True)
+
+    nav = scenarios.add_parser("nav", help="Build nav for many subrepo")
+    nav.add_argument("--width", type=int, default=20, help="Entries per level")
+    nav.add_argument("--depth", type=int, default=3, help="Levels of nav")
+    nav.add_argument("--groups", type=int, default=10, help="Subrepo groups")
+    nav.add_argument("--subrepo", type=int, default=500, help="Subrepo count")
+    nav.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also time the yaml.dump lookups replaced by the nav index",
+    )
+    nav.set_defaults(func=bench_nav)
+
+    schema = scenarios.add_parser(
+        "schema", help="Check and time compiled schema validators"
+    )
+    schema.add_argument(
+        "--groups", type=int, default=10, help="Groups in timed subrepo.yaml"
+    )
+    schema.add_argument(
+        "--subrepo", type=int, default=50, help="Subrepo per timed group"
+    )
+    schema.set_defaults(func=bench_schema)
+
+    load = scenarios.add_parser("load", help="Load many data files")
+    load.add_argument("--files", type=int, default=300, help="Repo files")
+    load.set_defaults(func=bench_load)
+
+    tags = scenarios.add_parser("tags", help="Build versions of many tags")
+    tags.add_argument("--tags", type=int, default=10000, help="Tag count")
+    tags.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also time the tag enumeration replaced by a single git command",
+    )
+    tags.set_defaults(func=bench_tags)
+
+    define_env = scenarios.add_parser(
+        "define_env", help="Run define_env on a generated workspace"
+    )
+    define_env.add_argument(
+        "--repos", type=int, default=40, help="Subrepo count"
+    )
+    define_env.add_argument(
+        "--depth", type=int, default=2, help="Levels of subrepo groups"
+    )
+    define_env.add_argument(
+        "--width", type=int, default=3, help="Subrepo groups per level"
+    )
+    define_env.add_argument(
+        "--tags", type=int, default=2000, help="Tags of the repo"
+    )
+    define_env.add_argument(
+        "--keys",
+        type=int,
+        default=2000,
+        help="Theme features in vars.yaml and keys in extra.yaml",
+    )
+    define_env.add_argument(
+        "--jobs", type=int, default=4, help="Subrepo fetched concurrently"
+    )
+    # Internal options used to run a single build in a new process
+    define_env.add_argument("--run", help=argparse.SUPPRESS)
+    define_env.add_argument(
+        "--runs", type=int, default=1, help=argparse.SUPPRESS
+    )
+    define_env.set_defaults(func=bench_define_env)
+
+    importtime = scenarios.add_parser(
+        "importtime", help="Time the import of plugins.py"
+    )
+    importtime.set_defaults(func=bench_importtime)
+
+    to_html = scenarios.add_parser(
+        "to_html", help="Render repo descriptions with to_html"
+    )
+    to_html.add_argument(
+        "--repos", type=int, default=300, help="Repo descriptions"
+    )
+    to_html.add_argument(
+        "--pages", type=int, default=3, help="Pages rendering every description"
+    )
+    to_html.set_defaults(func=bench_to_html)
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the scenario requested on the command line."""
+    args = parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
+
+# -----------------------------------------------------------------------------
+# VIM MODELINE
+# vim: fdm=indent
+# -----------------------------------------------------------------------------